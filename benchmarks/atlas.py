@@ -0,0 +1,54 @@
+# Sprite loading cost: every frame from its own PNG vs cut from the atlas pages.
+# Run from the repository root: python benchmarks/atlas.py
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from scripts.asset_loader import find_files
+from scripts.atlas import Atlas, build_atlas
+
+REPEATS = 20
+
+
+def time_load(load, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    sources = find_files('graphics/animations_spritesheet', '.png') + find_files('graphics/spritesheet_images', '.png')
+    atlas = Atlas(build_atlas(sources))
+    packed = [path for path in sources if path in atlas]
+
+    def load_files():
+        for path in packed:
+            img = pygame.image.load(path).convert()
+            img.set_colorkey((0, 0, 0))
+
+    def load_atlas():
+        atlas.frames()
+
+    def check_atlas():
+        build_atlas(sources)
+
+    files_ms = time_load(load_files)
+    atlas_ms = time_load(load_atlas)
+    print(f'{len(packed)} frames: {len(packed)} files vs {len(atlas.page_paths)} atlas page(s)')
+    print(f"{'per file (ms)':>14}{'atlas (ms)':>12}{'speedup':>10}{'stale check (ms)':>18}")
+    print(f'{files_ms:>14.2f}{atlas_ms:>12.2f}{files_ms / atlas_ms:>9.1f}x{time_load(check_atlas):>18.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# Level load time: parsing the TMX with pytmx vs loading the compiled level cache.
+# Run from the repository root: python benchmarks/level_load.py
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from scripts.tilemap import Tilemap
+
+LEVELS = ['level1', 'level2', 'level3']
+REPEATS = 20
+
+
+def time_load(load, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    print(f"{'level':<10}{'tmx (ms)':>12}{'compiled (ms)':>16}{'speedup':>10}")
+    for level in LEVELS:
+        tmx_path = f'./graphics/levels/{level}/{level}.tmx'
+
+        def load_tmx():
+            tilemap = Tilemap(None)
+            tilemap.load_data(tilemap.read_tmx(tmx_path))
+
+        def load_compiled():
+            Tilemap(None).load(level)
+
+        Tilemap(None).load(level)  # Make sure the compiled level exists
+        tmx_ms = time_load(load_tmx)
+        compiled_ms = time_load(load_compiled)
+        print(f'{level:<10}{tmx_ms:>12.2f}{compiled_ms:>16.2f}{tmx_ms / compiled_ms:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
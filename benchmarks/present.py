@@ -0,0 +1,48 @@
+# Cost of putting a 320x240 frame on the window: a new scaled surface blitted every frame, as presenting used to,
+# vs the Presenter scaling into the window surface, vs the Presenter's SDL renderer.
+# Run from the repository root: python benchmarks/present.py
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from scripts.presenter import Presenter
+
+WINDOW_SIZES = [(640, 480), (1280, 960), (1920, 1080)]
+FRAMES = 300
+
+
+def per_frame_ms(present):
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        present()
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+
+def main():
+    pygame.init()
+    print(f"{'window':>10}{'alloc + blit':>14}{'surface':>10}{'renderer':>10}  (ms/frame)")
+    for size in WINDOW_SIZES:
+        presenter = Presenter('present', screen_size=size)
+        display = pygame.Surface((320, 240))
+        display.fill((40, 190, 200))
+
+        def old():
+            screen = pygame.display.get_surface()
+            screen.blit(pygame.transform.scale(display, screen.get_size()), (0, 0))
+            pygame.display.update()
+
+        old_ms = per_frame_ms(old)
+        surface_ms = per_frame_ms(lambda: presenter.present(display))
+        presenter = Presenter('present', screen_size=size, renderer=True)
+        renderer_ms = per_frame_ms(lambda: presenter.present(display)) if presenter.renderer else float('nan')
+        if presenter.window:
+            presenter.window.destroy()
+        print(f"{'%dx%d' % size:>10}{old_ms:>14.3f}{surface_ms:>10.3f}{renderer_ms:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# Named stress scenarios for benchmarks/suite.py. Each one sets up a real Game and may top entities up every frame.
+import random
+import numpy as np
+import pygame
+
+from scripts.entities import Enemy
+from scripts.input_source import ScriptedInput
+from scripts.streaming import StreamingTilemap
+
+# Walk right and jump every two seconds
+RUN_RIGHT = {'loop': 120, 'events': [(0, 'down', 'RIGHT'), (0, 'down', 'UP'), (1, 'up', 'UP')]}
+
+
+class Scenario:
+    def __init__(self, name, level='level1', script=None, setup=None, per_frame=None):
+        """
+        :param name: Name used on the command line and in the results.
+        :param level: Stock level to load first.
+        :param script: ScriptedInput script as {'loop': ticks, 'events': [...]}, or None for no input.
+        :param setup: Called with the Game once the level is loaded.
+        :param per_frame: Called with the Game before every frame.
+        """
+        self.name = name
+        self.level = level
+        self.script = script
+        self.setup = setup
+        self.per_frame = per_frame
+
+    def input_source(self):
+        if self.script is None:
+            return ScriptedInput()
+        return ScriptedInput(self.script['events'], self.script.get('loop'))
+
+
+def view_rect(game):
+    return pygame.Rect(int(game.scroll[0]), int(game.scroll[1]), game.display.get_width(), game.display.get_height())
+
+
+def spawn_enemies(count):
+    # Drop enemies onto random ground spans, with enough health to last the run
+    def setup(game):
+        ground = [rect for rect in game.tilemap.solid_index.rows if rect.width >= 32]
+        for _ in range(count):
+            span = random.choice(ground)
+            enemy = Enemy(game, (random.randint(span.left, span.right - 6), span.top - 16), (6, 16))
+            enemy.health = 10 ** 9
+            game.enemies.append(enemy)
+    return setup
+
+
+def keep_leaves(count):
+    # Keep the view filled with falling leaves
+    def per_frame(game):
+        view = view_rect(game)
+        while len(game.particles) < count:
+            pos = (view.x + random.random() * view.width, view.y + random.random() * view.height)
+            game.particles.emit('leaf', pos, velocity=(-0.15, 0.3), frame=random.randint(0, 10))
+    return per_frame
+
+
+def keep_boss_shurikens(count):
+    # Keep shurikens flying out from the view in every direction, with a player who can't die
+    def per_frame(game):
+        game.player.health = game.player.max_health
+        view = view_rect(game)
+        while len(game.projectiles) < count:
+            pos = (view.x + random.random() * view.width, view.y + random.random() * view.height)
+            direction = pygame.Vector2(1, 0).rotate(random.random() * 360)
+            game.projectiles.emit('red_shuriken', pos, direction)
+    return per_frame
+
+
+def generated_map(width, height, enemies, streaming=False):
+    # Replace the level with a generated width x height map: rolling ground, floating platforms, trees and ladders.
+    # With streaming, the map is split into chunk files and only the chunks around the camera stay loaded
+    def setup(game):
+        if streaming:
+            game.tilemap.close()
+            game.tilemap = StreamingTilemap(game, tile_size=16)
+        tilemap = game.tilemap
+        rng = np.random.default_rng(0)
+        tiles = [('grass', 0, True, False), ('grass', 1, True, False), ('tree', 0, False, False), ('ladder', 0, False, True)]
+        ground, decor = np.zeros((2, height, width), dtype=np.uint16)
+
+        surface = np.clip(height // 2 + np.cumsum(rng.integers(-1, 2, width)), 8, height - 4)
+        for x in range(width):
+            ground[surface[x], x] = 1
+            ground[surface[x] + 1:surface[x] + 4, x] = 2
+        for _ in range(width * height // 2000):
+            x, y = int(rng.integers(0, width - 8)), int(rng.integers(4, height - 4))
+            ground[y, x:x + int(rng.integers(3, 8))] = 1
+        for x in rng.choice(width - 2, width // 20, replace=False).tolist():
+            decor[surface[x] - 3, x] = 3
+        for x in rng.choice(width, width // 40, replace=False).tolist():
+            decor[surface[x] - 6:surface[x], x] = 4
+
+        tilemap.load_data({
+            'layers': np.stack([ground, decor]),
+            'layer_names': ['Ground', 'Decor'],
+            'tiles': tiles,
+            'player_position': (16, int(surface[16]) - 1),
+            'enemy_positions': [],
+            'boss_positions': [],
+        })
+
+        game.player.pos = [16 * tilemap.tile_size, (int(surface[16]) - 1) * tilemap.tile_size]
+        game.scroll = list(game.player.pos)
+        game.enemies = []
+        for x in rng.choice(width, enemies, replace=False).tolist():
+            enemy = Enemy(game, (x * tilemap.tile_size, (int(surface[x]) - 1) * tilemap.tile_size), (6, 16))
+            enemy.health = 10 ** 9
+            game.enemies.append(enemy)
+        game.spatial_hash.rebuild(game.enemies)
+        tilemap.update((int(game.scroll[0]), int(game.scroll[1])), game.display.get_size())
+        game.refresh_tile_objects()
+    return setup
+
+
+SCENARIOS = {scenario.name: scenario for scenario in [
+    Scenario('idle_level1', 'level1'),
+    Scenario('idle_level2', 'level2'),
+    Scenario('idle_level3', 'level3'),
+    Scenario('enemies_500', 'level1', setup=spawn_enemies(500)),
+    Scenario('leaves_5000', 'level1', per_frame=keep_leaves(5000)),
+    Scenario('leaves_30000', 'level1', per_frame=keep_leaves(30000)),
+    Scenario('boss_shurikens_1000', 'level1', per_frame=keep_boss_shurikens(1000)),
+    Scenario('boss_shurikens_5000', 'level1', per_frame=keep_boss_shurikens(5000)),
+    Scenario('generated_1000x1000', 'level1', script=RUN_RIGHT, setup=generated_map(1000, 1000, 200)),
+    Scenario('streaming_1000x1000', 'level1', script=RUN_RIGHT, setup=generated_map(1000, 1000, 200, streaming=True)),
+]}
@@ -0,0 +1,54 @@
+# Sound effect cost in a burst: every hit calling Sound.play directly vs going through the SoundEffects voice pool.
+# Run from the repository root: python benchmarks/sfx.py
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from scripts.sfx import SoundEffects
+
+PLAYS_PER_FRAME = 200  # E.g. a crowd of enemies all hit in the same frame
+FRAMES = 60
+SOUNDS = ['damage', 'death', 'shuriken_throw']
+
+
+def burst(play):
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        for i in range(PLAYS_PER_FRAME):
+            play(SOUNDS[i % len(SOUNDS)])
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+
+def busy_channels():
+    return sum(pygame.mixer.Channel(i).get_busy() for i in range(pygame.mixer.get_num_channels()))
+
+
+def main():
+    pygame.mixer.init()
+    sounds = {name: pygame.mixer.Sound(f'audio/{name}.ogg') for name in SOUNDS}
+
+    # Raw: whatever channel pygame finds, stealing the oldest one when all are busy
+    pygame.mixer.set_num_channels(32)
+    raw_ms = burst(lambda name: sounds[name].play())
+    raw_busy = busy_channels()
+    pygame.mixer.stop()
+
+    sfx = SoundEffects()
+    sfx.add('death', sounds['death'], priority=2, max_voices=3, cooldown_ms=30)
+    sfx.add('shuriken_throw', sounds['shuriken_throw'], volume=0.5, priority=2)
+    sfx.add('damage', sounds['damage'], priority=1, max_voices=3, cooldown_ms=50)
+    pooled_ms = burst(sfx.play)
+    pooled_busy = busy_channels()
+
+    print(f'{PLAYS_PER_FRAME} plays per frame for {FRAMES} frames')
+    print(f"{'':>8}{'ms/frame':>10}{'busy channels':>15}{'dropped':>9}")
+    print(f"{'raw':>8}{raw_ms:>10.2f}{raw_busy:>15}{'-':>9}")
+    print(f"{'pooled':>8}{pooled_ms:>10.2f}{pooled_busy:>15}{sfx.dropped:>9}")
+
+
+if __name__ == '__main__':
+    main()
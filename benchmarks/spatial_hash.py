@@ -0,0 +1,101 @@
+# Entity update cost as the enemy count grows: spatial hash broadphase vs scanning every enemy.
+# Run from the repository root:
+#   python benchmarks/spatial_hash.py                              10 to 2000 enemies, linear scan up to 500
+#   python benchmarks/spatial_hash.py --counts 100 1000 --frames 20
+#   python benchmarks/spatial_hash.py --linear-max 2000            also scan linearly at every count (slow, O(n^2))
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import Game
+from scripts.entities import Enemy
+from scripts.spatial_hash import SpatialHash
+
+ENEMY_COUNTS = [10, 100, 500, 1000, 2000]
+PROJECTILES = 50
+FRAMES = 30
+LINEAR_MAX_ENEMIES = 500  # The linear scan is O(n^2) and takes seconds per frame past this
+
+
+# Same interface as SpatialHash, but every query returns every enemy like the old loops did
+class LinearScan:
+    def __init__(self, game):
+        self.game = game
+
+    def rebuild(self, objects):
+        pass
+
+    def remove(self, obj):
+        pass
+
+    def query(self, rect, exclude=None):
+        return [enemy for enemy in self.game.enemies if enemy is not exclude]
+
+    def neighbors(self, obj, radius=0):
+        return self.query(obj.rect(), exclude=obj)
+
+
+def populate(game, count):
+    # Drop enemies onto random ground spans, with enough health to survive the run
+    random.seed(count)
+    ground = [rect for rect in game.tilemap.solid_index.rows if rect.width >= 32]
+    game.enemies = []
+    for _ in range(count):
+        span = random.choice(ground)
+        enemy = Enemy(game, (random.randint(span.left, span.right - 6), span.top - 16), (6, 16))
+        enemy.health = 10 ** 9
+        game.enemies.append(enemy)
+
+    shots = []
+    for _ in range(PROJECTILES):
+        target = random.choice(game.enemies)
+        shots.append((target.rect().center, (random.choice([-2, 2]), 0)))
+    return shots
+
+
+def run_frames(game, shots, frames=FRAMES):
+    times = []
+    for _ in range(frames):
+        game.projectiles.clear()
+        for pos, velocity in shots:
+            game.projectiles.emit('shuriken', pos, velocity)
+        start = time.perf_counter()
+        game.spatial_hash.rebuild(game.enemies)
+        for enemy in game.enemies:
+            enemy.update(game.tilemap)
+        game.projectiles.update()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entity update cost: spatial hash vs linear scan')
+    parser.add_argument('--counts', type=int, nargs='+', default=ENEMY_COUNTS, help='enemy counts to time')
+    parser.add_argument('--frames', type=int, default=FRAMES, help='frames to time per count')
+    parser.add_argument('--linear-max', type=int, default=LINEAR_MAX_ENEMIES, help='largest count to also time the linear scan at')
+    args = parser.parse_args()
+
+    game = Game(headless=True)
+    game.load_level('level1')
+
+    print(f"{'enemies':>8}{'linear (ms)':>14}{'hash (ms)':>12}{'speedup':>10}")
+    for count in args.counts:
+        game.spatial_hash = SpatialHash()
+        hash_ms = run_frames(game, populate(game, count), args.frames)
+        if count > args.linear_max:
+            print(f"{count:>8}{'-':>14}{hash_ms:>12.2f}{'-':>10}")
+            continue
+        game.spatial_hash = LinearScan(game)
+        linear_ms = run_frames(game, populate(game, count), args.frames)
+        print(f'{count:>8}{linear_ms:>14.2f}{hash_ms:>12.2f}{linear_ms / hash_ms:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
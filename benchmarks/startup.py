@@ -0,0 +1,46 @@
+# Startup time: time to first frame and time to interactive, with assets decoded on the main thread vs on worker threads.
+# Run from the repository root: python benchmarks/startup.py
+import asyncio
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from main import Game
+
+WORKER_COUNTS = [0, 2, 4, 8]
+REPEATS = 5
+
+
+def startup(workers, load_async):
+    main.ASSET_WORKERS = workers
+    game = Game(load_async=load_async)
+    if not game.loaded:
+        asyncio.run(game.load_assets())
+    game.show_start_screen_screen()
+    return game.startup_times
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main_():
+    startup(0, False)  # Warm the OS file cache
+
+    print(f"{'workers':>8}{'loading screen':>16}{'first frame (ms)':>18}{'loaded (ms)':>13}{'interactive (ms)':>18}")
+    for workers in WORKER_COUNTS:
+        for load_async in (False, True):
+            runs = [startup(workers, load_async) for _ in range(REPEATS)]
+            first_frame = median([run['first_frame'] for run in runs])
+            loaded = median([run['assets_loaded'] for run in runs])
+            interactive = median([run['interactive'] for run in runs])
+            print(f"{workers:>8}{'yes' if load_async else 'no':>16}{first_frame:>18.1f}{loaded:>13.1f}{interactive:>18.1f}")
+
+
+if __name__ == '__main__':
+    main_()
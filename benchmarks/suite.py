@@ -0,0 +1,161 @@
+# Frame time of the real Game in scripted stress scenarios, split into the stages Game's profiler times.
+# Run from the repository root:
+#   python benchmarks/suite.py                                   run every scenario
+#   python benchmarks/suite.py leaves_5000 --frames 300          run some of them
+#   python benchmarks/suite.py --stages                          also list the stages inside update and render
+#   python benchmarks/suite.py --output baseline.json            save the results
+#   python benchmarks/suite.py --baseline baseline.json          compare against saved results, exit 1 on a regression
+# Baselines are only comparable on the machine they were recorded on.
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import Game
+from scenarios import SCENARIOS
+from scripts.streaming import StreamingTilemap
+
+FRAMES = 600
+WARMUP_FRAMES = 30  # Not counted, lets chunk baking and caches settle
+REGRESSION_THRESHOLD = 0.10  # Relative p50 slowdown reported as a regression
+MIN_REGRESSION_MS = 0.05  # Smaller p50 changes are timer noise, however large relative to a tiny stage
+TOP_STAGES = ['update', 'render', 'present']
+
+
+def summarize(times):
+    times = sorted(times)
+    return {
+        'mean': sum(times) / len(times),
+        'p50': times[len(times) // 2],
+        'p99': times[min(len(times) - 1, int(len(times) * 0.99))],
+    }
+
+
+def run_scenario(scenario, frames=FRAMES):
+    """
+    Play a scenario headless and time every frame.
+
+    :param scenario: Scenario from scenarios.SCENARIOS.
+    :param frames: Frames to time after the warmup.
+    :return: Dict with the setup time and mean/p50/p99 in ms for the whole frame and each profiled stage.
+             Streaming maps also report how many chunks were resident at the end and at most.
+    """
+    # Headless keeps audio and the clock out of the loop, the suite still renders and presents every frame
+    game = Game(headless=True, seed=0, input_source=scenario.input_source(), profile=True)
+    game.current_level = scenario.level
+    start = time.perf_counter()
+    game.load_level(scenario.level)
+    if scenario.setup:
+        scenario.setup(game)
+    setup_ms = (time.perf_counter() - start) * 1000
+
+    profiler = game.profiler
+    stages = {}
+    totals = []
+    resident = []  # Resident chunks after every timed frame, streaming maps only
+    for frame in range(WARMUP_FRAMES + frames):
+        if scenario.per_frame:
+            scenario.per_frame(game)
+        profiler.begin_frame()
+        with profiler.span('update'):
+            game.update()
+        with profiler.span('render'):
+            game.render()
+        with profiler.span('present'):
+            game.present()
+        profiler.end_frame()
+        if frame >= WARMUP_FRAMES:
+            totals.append(profiler.frames[-1][1] * 1000)
+            for name, ms in profiler.last_frame().items():
+                stages.setdefault(name, []).append(ms)
+            if isinstance(game.tilemap, StreamingTilemap):
+                resident.append(len(game.tilemap.resident))
+
+    result = {
+        'setup_ms': setup_ms,
+        'frame': summarize(totals),
+        'stages': {name: summarize(times) for name, times in stages.items()},
+        'entities': {'enemies': len(game.enemies), 'particles': len(game.particles), 'projectiles': len(game.projectiles)},
+    }
+    if resident:
+        tilemap = game.tilemap
+        result['chunks'] = {'resident': resident[-1], 'peak': max(resident),
+                            'map': -(-tilemap.width // tilemap.chunk_size) * -(-tilemap.height // tilemap.chunk_size)}
+    game.tilemap.close()
+    return result
+
+
+def print_result(name, result, verbose=False):
+    frame = result['frame']
+    print(f"{name:<22}{frame['mean']:>9.2f}{frame['p50']:>9.2f}{frame['p99']:>9.2f}   "
+          + '  '.join(f"{stage} {result['stages'][stage]['p50']:.2f}" for stage in TOP_STAGES))
+    if 'chunks' in result:
+        chunks = result['chunks']
+        print(f"  resident chunks {chunks['resident']}, peak {chunks['peak']} of {chunks['map']}")
+    if verbose:
+        for stage, times in result['stages'].items():
+            if stage not in TOP_STAGES:
+                print(f"  {stage:<20}{times['mean']:>9.2f}{times['p50']:>9.2f}{times['p99']:>9.2f}")
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    # Print p50 changes against the baseline and return the names of everything that got slower than the threshold
+    regressions = []
+    print(f"\n{'vs baseline (p50)':<30}{'base':>9}{'now':>9}{'change':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        rows = [('frame', baseline[name]['frame'], result['frame'])]
+        rows += [(stage, baseline[name]['stages'][stage], times) for stage, times in result['stages'].items() if stage in baseline[name]['stages']]
+        for stage, base, now in rows:
+            change = (now['p50'] - base['p50']) / base['p50'] if base['p50'] else 0.0
+            flag = ''
+            if change > threshold and now['p50'] - base['p50'] > MIN_REGRESSION_MS:
+                flag = '  REGRESSION'
+                regressions.append(f'{name}/{stage}')
+            print(f"{name + '/' + stage:<30}{base['p50']:>9.2f}{now['p50']:>9.2f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark scenarios')
+    parser.add_argument('scenarios', nargs='*', help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('--frames', type=int, default=FRAMES, help='frames to time per scenario')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results saved with --output')
+    parser.add_argument('--stages', action='store_true', help='also print every profiled stage inside update and render')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario {name}')
+
+    results = {}
+    print(f"{'scenario (ms)':<22}{'mean':>9}{'p50':>9}{'p99':>9}   stage p50")
+    for name in names:
+        results[name] = run_scenario(SCENARIOS[name], args.frames)
+        print_result(name, results[name], args.stages)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
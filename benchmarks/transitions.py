@@ -0,0 +1,72 @@
+# Cost of one transition step: re-rendering the level under a freshly drawn iris mask every step, as the old
+# iris-out did, vs blitting a snapshot and a cached mask.
+# Run from the repository root: python benchmarks/transitions.py
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from main import Game
+from scripts.transitions import Iris, Fade, Wipe
+
+REPEATS = 5
+
+
+def rerender_iris(game):
+    # The old iris-out: everything drawn again, then a new mask Surface per step
+    display = game.display
+    center = (display.get_width() // 2, display.get_height() // 2)
+    for radius in range(max(display.get_size()) * 2, 0, -12):
+        display.blit(game.current_background, (0, 0))
+        render_scroll = (int(game.scroll[0]), int(game.scroll[1]))
+        game.tilemap.render(display, offset=render_scroll)
+        game.player.render(display, offset=render_scroll)
+        for enemy in game.enemies:
+            enemy.render(display, offset=render_scroll)
+        game.particles.render(display, offset=render_scroll)
+        game.projectiles.render(display, offset=render_scroll)
+        game.ui.render(display)
+        surface = pygame.Surface(display.get_size())
+        surface.fill((0, 0, 0))
+        pygame.draw.circle(surface, (255, 255, 255), center, radius)
+        surface.set_colorkey((255, 255, 255))
+        display.blit(surface, (0, 0))
+
+
+def play(game, transition):
+    while not transition.done:
+        transition.step(game.display)
+
+
+def per_step_ms(run, steps):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000 / steps)
+    return sorted(times)[REPEATS // 2]
+
+
+def main():
+    game = Game(headless=True)
+    game.load_level('level1')
+    game.render()
+    snapshot = game.display.copy()
+    start_radius = max(game.display.get_size()) * 2
+
+    rows = [('re-rendered iris', per_step_ms(lambda: rerender_iris(game), len(range(start_radius, 0, -12))))]
+    for name, make in [('iris', lambda: Iris(snapshot, start_radius=start_radius)),
+                       ('fade', lambda: Fade(snapshot)), ('wipe', lambda: Wipe(snapshot))]:
+        rows.append((name, per_step_ms(lambda: play(game, make()), make().frames)))
+
+    print(f"{'transition':>18}{'ms/step':>10}")
+    for name, ms in rows:
+        print(f'{name:>18}{ms:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
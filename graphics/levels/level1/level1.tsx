@@ -1,4 +1,93 @@
 <?xml version="1.0" encoding="UTF-8"?>
 <tileset version="1.10" tiledversion="1.10.2" name="tilesheet" tilewidth="16" tileheight="16" tilecount="30" columns="10">
  <image source="tilesheet.png" width="160" height="48"/>
+ <tile id="9">
+  <properties>
+   <property name="type" value="decor"/>
+   <property name="variant" type="int" value="4"/>
+  </properties>
+ </tile>
+ <tile id="10">
+  <properties>
+   <property name="type" value="decor"/>
+   <property name="variant" type="int" value="0"/>
+  </properties>
+ </tile>
+ <tile id="11">
+  <properties>
+   <property name="type" value="decor"/>
+   <property name="variant" type="int" value="2"/>
+  </properties>
+ </tile>
+ <tile id="12">
+  <properties>
+   <property name="type" value="decor"/>
+   <property name="variant" type="int" value="3"/>
+  </properties>
+ </tile>
+ <tile id="13">
+  <properties>
+   <property name="type" value="decor"/>
+   <property name="variant" type="int" value="1"/>
+  </properties>
+ </tile>
+ <tile id="15">
+  <properties>
+   <property name="type" value="grass"/>
+   <property name="variant" type="int" value="0"/>
+   <property name="solid" type="bool" value="true"/>
+  </properties>
+ </tile>
+ <tile id="16">
+  <properties>
+   <property name="type" value="grass"/>
+   <property name="variant" type="int" value="1"/>
+   <property name="solid" type="bool" value="true"/>
+  </properties>
+ </tile>
+ <tile id="17">
+  <properties>
+   <property name="type" value="grass"/>
+   <property name="variant" type="int" value="2"/>
+   <property name="solid" type="bool" value="true"/>
+  </properties>
+ </tile>
+ <tile id="18">
+  <properties>
+   <property name="type" value="grass"/>
+   <property name="variant" type="int" value="3"/>
+   <property name="solid" type="bool" value="true"/>
+  </properties>
+ </tile>
+ <tile id="19">
+  <properties>
+   <property name="type" value="ladder"/>
+   <property name="variant" type="int" value="0"/>
+   <property name="ladder" type="bool" value="true"/>
+  </properties>
+ </tile>
+ <tile id="20">
+  <properties>
+   <property name="type" value="tree"/>
+   <property name="variant" type="int" value="0"/>
+  </properties>
+ </tile>
+ <tile id="21">
+  <properties>
+   <property name="type" value="tree"/>
+   <property name="variant" type="int" value="1"/>
+  </properties>
+ </tile>
+ <tile id="22">
+  <properties>
+   <property name="type" value="tree"/>
+   <property name="variant" type="int" value="2"/>
+  </properties>
+ </tile>
+ <tile id="23">
+  <properties>
+   <property name="type" value="tree"/>
+   <property name="variant" type="int" value="3"/>
+  </properties>
+ </tile>
 </tileset>
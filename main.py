@@ -1,92 +1,252 @@
 # /// script
 # dependencies = [
 #  "pytmx",
+#  "numpy",
 # ]
 # ///
+import argparse
+import os
 import pygame
 import sys
+import time
 import random
-import math
-from scripts.entities import PhysicsEntity, Player, Enemy, Boss
+from scripts.entities import Player, Enemy, Boss
 from scripts.utils import *
 from scripts.tilemap import Tilemap
+from scripts.streaming import StreamingTilemap
 from scripts.clouds import Clouds
-from scripts.particle import Particle, SkullParticle
-from scripts.projectiles import Projectile, Shuriken
+from scripts.particle import ParticleSystem
+from scripts.projectiles import ProjectileSystem
 from scripts.ui import UI
+from scripts.menus import Menus
+from scripts.spatial_hash import SpatialHash
+from scripts.activity import ActivityRegions
+from scripts.transform_cache import TransformCache
+from scripts.input_source import LiveInput, ScriptedInput
+from scripts.profiler import Profiler, ProfilerOverlay
+from scripts.asset_loader import AssetLoader, ASSET_WORKERS, find_files
+from scripts.atlas import Atlas, check_atlas, rebuild_atlas
+from scripts.music import Music
+from scripts.sfx import SoundEffects
+from scripts.transitions import Iris, Fade, Wipe
+from scripts.presenter import Presenter
+from scripts.assets import AssetManager, image, images, animation, asset_surfaces, surface_bytes
 import asyncio
+from functools import partial
+
+PROFILE_TRACE_PATH = 'profile_trace.json'  # Where F4 writes the profiler's Chrome trace
+TICK_RATE = 60  # Simulation ticks per second, all movement and cooldowns are tuned per tick
+TICK_TIME = 1 / TICK_RATE
+MAX_FPS = 144  # Render frame cap, 0 for uncapped
+MAX_CATCH_UP_TICKS = 5  # Most ticks one frame may run to catch up, past that the game slows down instead of stalling
+MENU_IDLE_TIMEOUT = 0.5  # Longest an idle menu blocks waiting for an event
+MENU_POLL_TIME = 1 / 30  # How often an idle menu polls for events in the web build
+LOADING_POLL_TIME = 1 / 60  # Longest the loading screen waits on the asset loader before redrawing
+ATLAS_TASK = 'repack atlas'  # Name of the loader task that rebuilds a stale atlas
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=None, seed=None, input_source=None, profile=None, max_fps=MAX_FPS, load_async=False,
+                 renderer=None, fullscreen=False):
+        """
+        :param headless: Run without a window or audio and skip presenting frames. Defaults to the NINJA_HEADLESS env var.
+        :param seed: Seed for random, so runs repeat exactly. Headless runs default to 0.
+        :param input_source: Where key and mouse events come from, LiveInput() by default.
+        :param profile: Time every frame stage from the start. Defaults to the NINJA_PROFILE env var, F3 turns it on in game.
+        :param max_fps: Render frame cap. The simulation always ticks at TICK_RATE.
+        :param load_async: Return while assets are still decoding, run() shows a loading screen until they are done.
+                           Headless games always finish loading here.
+        :param renderer: Scale frames up with an SDL renderer instead of on the CPU. Defaults to the NINJA_RENDERER env var.
+        :param fullscreen: Start fullscreen, F11 toggles it.
+        """
+        self.startup_start = time.perf_counter()
+        self.startup_times = {}  # Milliseconds from here to the first frame, assets loaded and interactive
+        self.headless = os.environ.get('NINJA_HEADLESS') == '1' if headless is None else headless
+        if self.headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+            seed = 0 if seed is None else seed
+        if seed is not None:
+            random.seed(seed)
+        self.input = input_source or LiveInput()
+        self.profile = os.environ.get('NINJA_PROFILE') == '1' if profile is None else profile
+        self.profiler = Profiler(enabled=self.profile)
+        self.show_profiler = False
+
         pygame.init()
-        pygame.mixer.init()
+        if not self.headless:
+            pygame.mixer.init()
 
-        pygame.display.set_caption("Ninja Platformer")
-        self.screen = pygame.display.set_mode((640, 480))
+        renderer = os.environ.get('NINJA_RENDERER') == '1' if renderer is None else renderer
+        self.presenter = Presenter("Ninja Platformer", renderer=renderer and not self.headless, fullscreen=fullscreen)
         self.display = pygame.Surface((320, 240))
-        self.pygame_play_mixer = True
 
         self.clock = pygame.time.Clock()
+        self.max_fps = max_fps
+        self.tick_accumulator = None  # Real time not yet simulated, None until the loop (re)starts
         self.show_start_screen = True
         self.show_level_selector = False
         self.current_level = None
         self.is_paused = False  # New attribute to track if the game is pause
+        self.level_intro = False  # Set when a level (re)loads, run() fades it in
+        self.tilemap = None
+        # Levels marked 'streaming' keep only the chunks around the camera in memory
         self.levels = {
-            'level1': {'completed': False, 'tilemap': 'level1', 'background': 'background1'},
-            'level2': {'completed': False, 'tilemap': 'level2', 'background': 'background2'},
-            'level3': {'completed': False, 'tilemap': 'level3', 'background': 'background3'}
+            'level1': {'completed': False, 'tilemap': 'level1', 'background': 'background1', 'assets': ['tiles', 'boss', 'sky1'], 'music': 'audio/beat.ogg'},
+            'level2': {'completed': False, 'tilemap': 'level2', 'background': 'background2', 'assets': ['tiles', 'boss', 'sky2'], 'music': 'audio/beat.ogg'},
+            'level3': {'completed': False, 'tilemap': 'level3', 'background': 'background3', 'assets': ['tiles', 'boss', 'sky3'], 'music': 'audio/beat.ogg'}
         }
 
         self.movement = [False, False]
 
-        self.assets = {
-            'grass': load_images('spritesheet_images/grass'),
-            'player': load_images('animations_spritesheet/player'),
-            'exclamation': load_image('spritesheet_images/exclamation.png'),
-            'skull': load_image('spritesheet_images/skull.png'),
-            'player/idle': Animation(load_images('animations_spritesheet/player/idle'), img_dur=10),
-            'player/jump': Animation(load_images('animations_spritesheet/player/jump')),
-            'player/run': Animation(load_images('animations_spritesheet/player/run'), img_dur=8),
-            'player/climb': Animation(load_images('animations_spritesheet/player/climb'), img_dur=10),
-            'enemy': load_images('animations_spritesheet/enemy'),
-            'enemy/idle': Animation(load_images('animations_spritesheet/enemy/idle'), img_dur=10),
-            'enemy/run': Animation(load_images('animations_spritesheet/enemy/run'), img_dur=8),
-            'background1': load_image('spritesheet_images/sky/0.png'),
-            'background2': load_image('spritesheet_images/sky/1.png'),
-            'background3': load_image('spritesheet_images/sky/2.png'),
-            'decor': load_images('spritesheet_images/decor'),
-            'tree': load_images('spritesheet_images/tree'),
-            'ladder': load_images('spritesheet_images/ladder'),
-            'clouds': load_images('spritesheet_images/cloud'),
-            'projectiles/shuriken': Animation(load_images('animations_spritesheet/player/projectiles/shuriken'), img_dur=3),
-            'projectiles/red_shuriken': Animation(load_images('animations_spritesheet/enemy/projectiles/red_shuriken'), img_dur=3),
-            'particle/leaf': Animation(load_images('animations_spritesheet/particles/leaf'), img_dur=20, loop=False),
-            'boss': load_images('animations_spritesheet/boss'),
-            'boss/idle': Animation(load_images('animations_spritesheet/boss/idle'), img_dur=10),
-            'boss/run': Animation(load_images('animations_spritesheet/boss/run'), img_dur=6),
-            'checkmark': load_image('spritesheet_images/checkmark.png'),  # Load the checkmark image
-        }
-
-        self.audio = {
-            'climbing': pygame.mixer.Sound('audio/climbing.ogg'),
-            'death': pygame.mixer.Sound('audio/death.ogg'),
-            'shuriken_throw': pygame.mixer.Sound('audio/shuriken_throw.ogg'),
-            'damage': pygame.mixer.Sound('audio/damage.ogg'),
-            'walking': pygame.mixer.Sound('audio/walking.ogg'),
-        }
-
-        self.music = {
-            'beat': pygame.mixer.Sound('audio/beat.ogg'),
-        }
-
-        self.clouds = Clouds(load_images('spritesheet_images/cloud'), count=16)
+        # Sprite frames are packed into a few atlas pages. Checking them only stats the sources here; when a source
+        # PNG changed they are repacked on a loader thread behind the loading screen, and finish_loading switches to them
+        sources = find_files(BASE_IMG_PATH + 'animations_spritesheet', '.png') + find_files(BASE_IMG_PATH + 'spritesheet_images', '.png')
+        manifest = check_atlas(sources)
+        self.atlas = Atlas(manifest) if manifest else None
+        # Images left out of the atlas, like the skies, are only read when a level first needs them
+        paths = list(self.atlas.page_paths) if self.atlas else []
+        tasks = {} if self.atlas else {ATLAS_TASK: partial(rebuild_atlas, sources)}
+
+        # Decode every image and sound on worker threads, the rest of the setup waits for them in finish_loading
+        if not self.headless:
+            # Music tracks are streamed while they play instead, see scripts/music.py
+            tracks = {level['music'] for level in self.levels.values()}
+            paths += [path for path in find_files('audio', '.ogg') if path not in tracks]
+        self.loader = AssetLoader(paths, workers=0 if sys.platform == 'emscripten' else ASSET_WORKERS, tasks=tasks)
+        self.loaded = False
+        self.menus = Menus(self)
+        if not load_async or self.headless:
+            self.finish_loading()
+
+    def finish_loading(self):
+        # Convert what the loader decoded on this thread and set up everything that needs assets
+        decoded = self.loader.results()
+        if ATLAS_TASK in decoded:
+            # Repacked this run. The pages it built are used straight away, even if they couldn't be saved
+            manifest, pages = decoded.pop(ATLAS_TASK)
+            self.atlas = Atlas(manifest)
+            decoded.update(pages)
+        preloaded.update(decoded)
+        if self.atlas:
+            atlas_frames.update(self.atlas.frames(decoded))
+
+        # Loaded on first use. Levels hold the groups they list under 'assets', the rest are released on level change
+        self.transforms = TransformCache()
+        self.assets = AssetManager({
+            'common': {
+                'player': images('animations_spritesheet/player'),
+                'exclamation': image('spritesheet_images/exclamation.png'),
+                'skull': image('spritesheet_images/skull.png'),
+                'player/idle': animation('animations_spritesheet/player/idle', img_dur=10),
+                'player/jump': animation('animations_spritesheet/player/jump'),
+                'player/run': animation('animations_spritesheet/player/run', img_dur=8),
+                'player/climb': animation('animations_spritesheet/player/climb', img_dur=10),
+                'enemy': images('animations_spritesheet/enemy'),
+                'enemy/idle': animation('animations_spritesheet/enemy/idle', img_dur=10),
+                'enemy/run': animation('animations_spritesheet/enemy/run', img_dur=8),
+                'clouds': images('spritesheet_images/cloud'),
+                'projectiles/shuriken': animation('animations_spritesheet/player/projectiles/shuriken', img_dur=3),
+                'projectiles/red_shuriken': animation('animations_spritesheet/enemy/projectiles/red_shuriken', img_dur=3),
+                'particle/leaf': animation('animations_spritesheet/particles/leaf', img_dur=20, loop=False),
+                'checkmark': image('spritesheet_images/checkmark.png'),  # Load the checkmark image
+            },
+            'tiles': {
+                'grass': images('spritesheet_images/grass'),
+                'decor': images('spritesheet_images/decor'),
+                'tree': images('spritesheet_images/tree'),
+                'ladder': images('spritesheet_images/ladder'),
+            },
+            'boss': {
+                'boss': images('animations_spritesheet/boss'),
+                'boss/idle': animation('animations_spritesheet/boss/idle', img_dur=10),
+                'boss/run': animation('animations_spritesheet/boss/run', img_dur=6),
+            },
+            'sky1': {'background1': image('spritesheet_images/sky/0.png')},
+            'sky2': {'background2': image('spritesheet_images/sky/1.png')},
+            'sky3': {'background3': image('spritesheet_images/sky/2.png')},
+        }, on_load=self.asset_loaded, on_release=self.asset_released)
+        self.assets.acquire(['common'])
+        self.level_assets = []
+
+        # Kills and throws outrank hit sounds when every voice is busy. A burst of hits plays at most a few at once
+        self.sfx = SoundEffects(silent=self.headless)
+        self.sfx.add('climbing', load_sound('audio/climbing.ogg', silent=self.headless), loop=True)
+        self.sfx.add('walking', load_sound('audio/walking.ogg', silent=self.headless), loop=True)
+        self.sfx.add('death', load_sound('audio/death.ogg', silent=self.headless), priority=2, max_voices=3, cooldown_ms=30)
+        self.sfx.add('shuriken_throw', load_sound('audio/shuriken_throw.ogg', silent=self.headless), volume=0.5, priority=2)
+        self.sfx.add('damage', load_sound('audio/damage.ogg', silent=self.headless), priority=1, max_voices=3, cooldown_ms=50)
+
+        self.music = Music(silent=self.headless)
+
+        self.clouds = Clouds(self.assets['clouds'], count=16)
+
+        self.particles = ParticleSystem(self)
+        self.projectiles = ProjectileSystem(self)
 
         # Initialize the UI
         self.ui = UI(self)
+        self.profiler_overlay = ProfilerOverlay(self)
+
+        preloaded.clear()
+        self.loaded = True
+        self.mark_startup('assets_loaded')
+
+    def asset_loaded(self, name, asset):
+        # Entities face left by mirroring their frames, make those once when the animation loads
+        if name.startswith(('player/', 'enemy/', 'boss/')):
+            self.transforms.warm(asset.images)
+
+    def asset_released(self, name, asset):
+        self.transforms.drop(asset_surfaces(asset))
+
+    def memory_report(self):
+        # Resident surface memory per asset group, then the shared atlas pages and the cached sprite transforms
+        lines = [f"{'group':<14}{'assets':>8}{'own KiB':>10}{'atlas KiB':>11}"]
+        for group, loaded, total, own, atlas in self.assets.memory_report():
+            lines.append(f"{group:<14}{f'{loaded}/{total}':>8}{own / 1024:>10.1f}{atlas / 1024:>11.1f}")
+        pages = {frame.get_parent() for frame in atlas_frames.values()}
+        lines.append(f"{'atlas pages':<14}{len(pages):>8}{sum(map(surface_bytes, pages)) / 1024:>10.1f}")
+        cached = list(self.transforms.pinned.values()) + list(self.transforms.entries.values())
+        lines.append(f"{'transforms':<14}{len(cached):>8}{sum(map(surface_bytes, cached)) / 1024:>10.1f}")
+        return '\n'.join(lines)
+
+    def mark_startup(self, name):
+        # Record how long after creating the Game a startup milestone was first reached. Printed once interactive when profiling
+        if name not in self.startup_times:
+            self.startup_times[name] = (time.perf_counter() - self.startup_start) * 1000
+            if self.profile and name == 'interactive':
+                print('Startup: ' + ', '.join(f"{milestone.replace('_', ' ')} {ms:.0f} ms" for milestone, ms in self.startup_times.items()))
+
+    async def load_assets(self):
+        # Start screen with a progress bar while the loader decodes, then the rest of the setup
+        progress = self.loader.progress()
+        while progress < 1.0:
+            events = self.input.get_events()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+            percent = int(progress * 100)
+            if self.menus.present(('loading', percent), lambda surf: self.menus.draw_start_screen(surf, percent), events, cache=False):
+                self.mark_startup('first_frame')
+            await asyncio.sleep(0)  # Lets the browser draw in the web build
+            progress = self.loader.poll(LOADING_POLL_TIME)  # Waits on the loader, so progress shows as soon as a job is done
+        self.finish_loading()
 
     def load_level(self, level_name):
-        self.tilemap = Tilemap(self, tile_size=16)
+        # Hold the new level's asset groups before letting go of the last one's, so shared groups stay loaded
+        level_assets = self.levels[level_name].get('assets', [])
+        self.assets.acquire(level_assets)
+        self.assets.release(self.level_assets)
+        self.level_assets = level_assets
+
+        if self.tilemap is not None:
+            self.tilemap.close()  # Stops a streaming tilemap's worker thread
+        if self.levels[level_name].get('streaming'):
+            self.tilemap = StreamingTilemap(self, tile_size=16)
+        else:
+            self.tilemap = Tilemap(self, tile_size=16)
         self.tilemap.load(self.levels[level_name]['tilemap'])
 
         self.player = Player(self, (self.tilemap.player_position[0] * self.tilemap.tile_size, self.tilemap.player_position[1] * self.tilemap.tile_size), (6, 16))
@@ -100,199 +260,168 @@ class Game:
                                         pos[1] * self.tilemap.tile_size),  # offset boss to be on the ground
                                         (14, 31)))
 
-        self.leaf_spawners = []
-        for tree in self.tilemap.extract([('tree', 0), ('tree', 1)], keep=True):
-            self.leaf_spawners.append(pygame.Rect(tree['pos'][0], tree['pos'][1], 23, 13))
-
-        self.ladders = []
-        for ladder in self.tilemap.extract([('ladder', 0)], keep=True):
-            self.ladders.append(pygame.Rect(ladder['pos'][0], ladder['pos'][1], 16, 16))
+        self.spatial_hash = SpatialHash()
+        self.spatial_hash.rebuild(self.enemies)
+        self.activity = ActivityRegions(self.display.get_size())
 
-        self.particles = []
-        self.projectiles = []
+        self.particles.clear()
+        self.projectiles.clear()
         self.scroll = [self.tilemap.player_position[0] * self.tilemap.tile_size, self.tilemap.player_position[1] * self.tilemap.tile_size]
+        self.prev_scroll = list(self.scroll)
+        self.tick_accumulator = None
+
+        self.tilemap.update((int(self.scroll[0]), int(self.scroll[1])), self.display.get_size())
+        self.refresh_tile_objects()
+        self.level_intro = True  # run() fades the level in before its first tick
 
         # Set the current background based on the level
         self.current_background = self.assets[self.levels[level_name]['background']]
 
-    async def iris_out_and_reset(self):
-        max_radius = max(self.screen.get_width(), self.screen.get_height())
-        radius = max_radius
-        screen_center = (self.display.get_width() // 2, self.display.get_height() // 2)
-
-        while (radius > 0):
-            self.display.blit(self.current_background, (0, 0))
-            render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-
-            # Render everything
-            self.tilemap.render(self.display, offset=render_scroll)
-            self.player.render(self.display, offset=render_scroll)
-
-            for enemy in self.enemies:
-                enemy.render(self.display, offset=render_scroll)
-
-            for particle in self.particles.copy():
-                particle.render(self.display, offset=render_scroll)
-
-            for projectile in self.projectiles.copy():
-                projectile.render(self.display, offset=render_scroll)
-
-            # Render UI
-            self.ui.render(self.display)
-
-            # Draw the iris-out effect
-            surface = pygame.Surface(self.display.get_size())
-            surface.fill((0, 0, 0))
-            pygame.draw.circle(surface, (255, 255, 255), screen_center, radius)
-            surface.set_colorkey((255, 255, 255))
-            self.display.blit(surface, (0, 0))
+    def refresh_tile_objects(self):
+        # Rebuild what is derived from tiles, whenever the tilemap reports tiles added or removed
+        self.tilemap_revision = self.tilemap.revision
 
-            radius -= 12    # Increase the decrement to make the effect go faster
+        self.leaf_spawners = []
+        for tree in self.tilemap.extract([('tree', 0), ('tree', 1)], keep=True):
+            self.leaf_spawners.append(pygame.Rect(tree['pos'][0], tree['pos'][1], 23, 13))
 
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-            pygame.display.update()
-            self.clock.tick(60)
+        self.ladders = []
+        for ladder in self.tilemap.extract([('ladder', 0)], keep=True):
+            self.ladders.append(pygame.Rect(ladder['pos'][0], ladder['pos'][1], 16, 16))
 
+    async def play_transition(self, transition):
+        # Step a transition to the end at the tick rate. The world stays frozen meanwhile
+        while not transition.done:
+            transition.step(self.display)
+            self.present()
+            self.clock.tick(TICK_RATE)
             await asyncio.sleep(0)
+        self.tick_accumulator = None  # Don't catch up on the time the transition took
 
-        # Reset the level
+    async def iris_out_and_reset(self):
+        # The display still holds the frame the player died on. Starting wider than the frame holds on it for a moment
+        await self.play_transition(Iris(self.display.copy(), start_radius=max(self.display.get_size()) * 2))
         self.load_level(self.current_level)
 
     async def run(self):
+        if not self.loaded:
+            await self.load_assets()
         while True:
-            self.play_music()
+            busy = True  # False when a menu is up with nothing changing
             if (self.show_start_screen):
-                self.music['beat'].stop()
-                self.audio['walking'].stop()
-                self.audio['climbing'].stop()
-                self.show_start_screen_screen() 
-                self.pygame_play_mixer = True
+                self.music.stop()
+                self.sfx.stop_loops()
+                busy = self.show_start_screen_screen()
             elif (self.show_level_selector):
-                self.music['beat'].stop()
-                self.audio['walking'].stop()
-                self.audio['climbing'].stop()
-                self.pygame_play_mixer = True
-                self.show_level_selector_screen()
+                self.music.stop()
+                self.sfx.stop_loops()
+                busy = self.show_level_selector_screen()
             elif (self.player.dead):
-                self.music['beat'].stop()
-                self.audio['walking'].stop()
-                self.audio['climbing'].stop()
-                self.pygame_play_mixer = True
+                self.music.stop()  # Starts over from the top once the level restarts
+                self.sfx.stop_loops()
+                self.menus.invalidate()
                 await self.iris_out_and_reset()
             elif self.is_paused:
-                self.show_pause_menu()
+                self.music.pause()
+                self.sfx.stop_loops()  # The player sets them again on the next tick
+                busy = self.show_pause_menu()
             else:
+                self.music.play(self.levels[self.current_level]['music'])
+                self.menus.invalidate()
+                if self.level_intro:
+                    # Fade in from black on the level's first frame
+                    self.level_intro = False
+                    self.render()
+                    await self.play_transition(Fade(self.display.copy(), closing=False))
                 self.main()
-            await asyncio.sleep(0)
-
-    def play_music(self):
-        if self.pygame_play_mixer:
-            self.pygame_play_mixer = False
-            self.music['beat'].set_volume(0.15)
-            self.music['beat'].play(-1)
+                if self.current_level is None:
+                    await self.play_transition(Wipe(self.display.copy()))  # Level completed, wipe away its last frame
+            if busy:
+                await asyncio.sleep(0)
+            else:
+                await self.idle()
+
+    def run_headless(self, level, ticks):
+        """
+        Step a level as fast as possible without presenting frames.
+
+        :param level: Name of the level to play, e.g. 'level1'.
+        :param ticks: Number of ticks to simulate. Stops early when the level is completed.
+        :return: Dict with the ticks run, wall time and the state the level ended in.
+        """
+        self.show_start_screen = False
+        self.current_level = level
+        self.load_level(level)
+
+        start = time.perf_counter()
+        tick = 0
+        while tick < ticks and self.current_level is not None:
+            if self.player.dead:
+                self.load_level(self.current_level)  # Restart straight away, the iris-out is only for show
+            elif self.is_paused:
+                self.pause_input(self.input.get_events())  # Nothing is drawn, scripted keys can still unpause
+            else:
+                self.main()
+            tick += 1
+        elapsed = time.perf_counter() - start
+
+        return {
+            'level': level,
+            'ticks': tick,
+            'seconds': elapsed,
+            'ticks_per_second': tick / elapsed if elapsed else 0.0,
+            'completed': self.levels[level]['completed'],
+            'player_health': self.player.health,
+            'enemies_left': len(self.enemies),
+        }
 
        
     def show_start_screen_screen(self):
-        self.screen.fill((0, 0, 0))
-        font = pygame.font.SysFont(None, 74)
-        title_text = font.render("Ninja Platformer", True, (255, 255, 255))
-        self.screen.blit(title_text, (self.screen.get_width() // 2 - title_text.get_width() // 2, 100))
-
-        start_font = pygame.font.SysFont(None, 48)
-        start_text = start_font.render("Click to Start", True, (255, 255, 255))
-        self.screen.blit(start_text, (self.screen.get_width() // 2 - start_text.get_width() // 2, 300))
-
-        pygame.display.update()
-
-        for event in pygame.event.get():
+        """
+        :return: True if the screen changed or input came in, False when the menu is sitting idle.
+        """
+        events = self.input.get_events()
+        redrawn = self.menus.present('start', self.menus.draw_start_screen, events)
+        if redrawn:
+            self.mark_startup('first_frame')
+            self.mark_startup('interactive')
+
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 self.show_start_screen = False
                 self.show_level_selector = True
+        return redrawn or bool(events)
 
     def show_level_selector_screen(self):
-        self.screen.fill((0, 0, 0))
-        font = pygame.font.SysFont(None, 48)
-        title_text = font.render("Select Level", True, (255, 255, 255))
-        self.screen.blit(title_text, (self.screen.get_width() // 2 - title_text.get_width() // 2, 50))
-
-        level_buttons = [
-            ("Level 1", 1),
-            ("Level 2", 2),
-            ("Level 3", 3)
-        ]
-
-        for idx, (level_name, level_num) in enumerate(level_buttons):
-            if level_num == 1 or self.levels[f'level{level_num-1}']['completed']:
-                color = (255, 255, 255)
-            else:
-                color = (100, 100, 100)
+        events = self.input.get_events()
+        redrawn = self.menus.present(self.menus.level_select_key(), self.menus.draw_level_selector, events)
 
-            level_text = font.render(level_name, True, color)
-            rect = level_text.get_rect(center=(self.screen.get_width() // 2, 150 + idx * 100))
-            self.screen.blit(level_text, rect)
-
-            # Draw the green checkmark if the level is completed
-            if self.levels[f'level{level_num}']['completed']:
-                checkmark_pos = (rect.right + 20, rect.centery - 5)  # Position the checkmark to the right of the level text
-                self.screen.blit(self.assets['checkmark'], checkmark_pos)
-
-        pygame.display.update()
-
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.MOUSEBUTTONDOWN:
-                for idx, (level_name, level_num) in enumerate(level_buttons):
-                    if level_num == 1 or self.levels[f'level{level_num-1}']['completed']:
-                        rect = pygame.Rect(self.screen.get_width() // 2 - 100, 150 + idx * 100 - 20, 200, 40)
-                        if rect.collidepoint(event.pos):
-                            self.load_level(f'level{level_num}')
-                            self.current_level = f'level{level_num}'
-                            self.show_level_selector = False
+                level_num = self.menus.level_at(self.presenter.to_screen(event.pos))
+                if level_num is not None:
+                    self.load_level(f'level{level_num}')
+                    self.current_level = f'level{level_num}'
+                    self.show_level_selector = False
+        return redrawn or bool(events)
 
     def show_pause_menu(self):
-        # Dim the background
+        events = self.input.get_events()
+        redrawn = self.menus.present_pause_menu(events)
+        self.pause_input(events)
+        return redrawn or bool(events)
+
+    def pause_input(self, events):
+        # Resume or leave for the level selector while paused. Clicks only come in while the menu is on screen
         self.movement = [False, False]
-        overlay = pygame.Surface(self.screen.get_size())
-        overlay.fill((150, 150, 150))
-        overlay.set_alpha(2)  # Transparency level (0 = fully transparent, 255 = fully opaque)
-        self.screen.blit(overlay, (0, 0))
-
-        # Calculate the position and size of the pause menu
-        menu_width = self.screen.get_width() // 2
-        menu_height = self.screen.get_height() // 2
-        menu_x = (self.screen.get_width() - menu_width) // 2
-        menu_y = (self.screen.get_height() - menu_height) // 2
-
-        # Draw the white menu background with a black border
-        menu_rect = pygame.Rect(menu_x, menu_y, menu_width, menu_height)
-        pygame.draw.rect(self.screen, (255, 255, 255), menu_rect)  # White background
-        pygame.draw.rect(self.screen, (0, 0, 0), menu_rect, 5)  # Black border with thickness 5
-
-        # Render the "Paused" text
-        font = pygame.font.SysFont(None, 74)
-        pause_text = font.render("Paused", True, (0, 0, 0))
-        pause_text_rect = pause_text.get_rect(center=(menu_rect.centerx, menu_rect.y + 50))
-        self.screen.blit(pause_text, pause_text_rect)
-
-        # Draw the "Resume" and "Return to Menu" options
-        option_font = pygame.font.SysFont(None, 48)
-        resume_text = option_font.render("Resume", True, (0, 0, 0))
-        menu_text = option_font.render("Main Menu", True, (0, 0, 0))
-
-        resume_rect = resume_text.get_rect(center=(menu_rect.centerx, menu_rect.centery))
-        menu_rect_text = menu_text.get_rect(center=(menu_rect.centerx, menu_rect.centery + 60))
-
-        self.screen.blit(resume_text, resume_rect)
-        self.screen.blit(menu_text, menu_rect_text)
-
-        pygame.display.update()
-
-        for event in pygame.event.get():
+        self.tick_accumulator = None  # Don't catch up on the time spent paused
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -300,12 +429,20 @@ class Game:
                 if event.key == pygame.K_ESCAPE:
                     self.is_paused = False  # Unpause the game
             if event.type == pygame.MOUSEBUTTONDOWN:
-                if resume_rect.collidepoint(event.pos):
+                pos = self.presenter.to_screen(event.pos)
+                if self.menus.resume_rect.collidepoint(pos):
                     self.is_paused = False  # Unpause the game
-                elif menu_rect_text.collidepoint(event.pos):
+                elif self.menus.main_menu_rect.collidepoint(pos):
                     self.show_level_selector = True
                     self.is_paused = False  # Go back to the level selector
 
+    async def idle(self):
+        # A menu with nothing to do waits for input instead of spinning. The web build can't block, so it sleeps on the event loop
+        if sys.platform == 'emscripten':
+            await asyncio.sleep(MENU_POLL_TIME)
+        else:
+            self.input.wait(MENU_IDLE_TIMEOUT)
+            await asyncio.sleep(0)
 
     def check_level_completion(self):
         if not any(isinstance(enemy, (Enemy, Boss)) for enemy in self.enemies):
@@ -315,102 +452,208 @@ class Game:
             self.current_level = None
 
     def main(self):
-
-        self.display.blit(self.current_background, (0, 0))
-        self.audio['shuriken_throw'].set_volume(0.5)
+        if self.headless:
+            # One tick per call, as fast as the caller steps
+            self.profiler.begin_frame()
+            with self.profiler.span('update'):
+                self.update()
+            self.profiler.end_frame()
+            self.check_level_completion()
+            return
+
+        # Fixed timestep: run the ticks real time asks for, then draw between the last two of them
+        frame_time = self.clock.tick(self.max_fps) / 1000
+        if self.tick_accumulator is None:
+            self.tick_accumulator = TICK_TIME  # (Re)starting after a load or the pause menu, start with one tick
+        else:
+            self.tick_accumulator += frame_time
+
+        self.profiler.begin_frame()
+        ticks = 0
+        while self.tick_accumulator >= TICK_TIME:
+            if ticks == MAX_CATCH_UP_TICKS:
+                self.tick_accumulator %= TICK_TIME  # Too far behind, drop the time instead of spiralling
+                break
+            with self.profiler.span('update'):
+                self.update()
+            self.tick_accumulator -= TICK_TIME
+            ticks += 1
+
+            self.check_level_completion()
+            if self.current_level is None or self.player.dead or self.is_paused:
+                self.tick_accumulator = None  # Leaving the loop for a menu or transition
+                break
+
+        alpha = self.tick_accumulator / TICK_TIME if self.tick_accumulator is not None else 1.0
+        with self.profiler.span('render'):
+            self.render(alpha)
+        with self.profiler.span('present'):
+            self.present()
+        self.profiler.end_frame()
+
+    def update(self):
+        # Remember where everything was, so render can draw in between this tick and the next
+        self.prev_scroll = list(self.scroll)
+        self.player.prev_pos = list(self.player.pos)
+        for enemy in self.enemies:
+            enemy.prev_pos = list(enemy.pos)
+        self.projectiles.remember_positions()
 
         self.scroll[0] += (self.player.rect().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
         self.scroll[1] += (self.player.rect().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
         render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
 
+        # Stream tilemap chunks around the camera
+        with self.profiler.span('tilemap stream'):
+            self.tilemap.update(render_scroll, self.display.get_size())
+            if self.tilemap.revision != self.tilemap_revision:
+                self.refresh_tile_objects()
+
         # Create leaf particles
-        for rect in self.leaf_spawners:
-            if random.random() * 49999 < rect.width * rect.height:
-                pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                self.particles.append(Particle(self, 'leaf', pos, velocity=[-0.15, 0.3], frame=random.randint(0, 10)))
+        with self.profiler.span('leaf spawn'):
+            for rect in self.leaf_spawners:
+                if random.random() * 49999 < rect.width * rect.height:
+                    pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
+                    self.particles.emit('leaf', pos, velocity=(-0.15, 0.3), frame=random.randint(0, 10))
+
+        # Update clouds, player and enemies
+        with self.profiler.span('clouds'):
+            self.clouds.update()
+
+        with self.profiler.span('player'):
+            self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
+
+        with self.profiler.span('enemies'):
+            # Broadphase for enemy separation and projectile hits this tick
+            self.spatial_hash.rebuild(self.enemies)
+
+            # Only enemies around the camera think and move, far away ones tick less often or sleep
+            for enemy, ticks in self.activity.ticking(self.enemies, render_scroll):
+                enemy.update(self.tilemap, ticks=ticks)
+
+        # animate particles
+        with self.profiler.span('particles'):
+            self.particles.update()
+
+        # animate projectiles
+        with self.profiler.span('projectiles'):
+            self.projectiles.update()
+
+        with self.profiler.span('events'):
+            for event in self.input.get_events():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_LEFT:
+                        self.movement[0] = True
+                    if event.key == pygame.K_RIGHT:
+                        self.movement[1] = True
+                    if event.key == pygame.K_UP:
+                        if self.player.action == 'climb':
+                            self.player.velocity[1] = -1
+                        elif event.key == pygame.K_UP and self.player.action != 'jump':
+                            self.player.velocity[1] = -3
+                    if event.key == pygame.K_DOWN:
+                        if self.player.action == 'climb':
+                            self.player.velocity[1] = 1
+                    if event.key == pygame.K_SPACE and self.player.shuriken_cooldown == 0:
+                        if self.player.flip:
+                            self.projectiles.emit('shuriken', self.player.rect().center, (-2, 0))
+                            self.player.throw_shuriken()
+                        else:
+                            self.projectiles.emit('shuriken', self.player.rect().center, (2, 0))
+                            self.player.throw_shuriken()
+                    if event.key == pygame.K_ESCAPE:
+                        self.is_paused = not self.is_paused  # Toggle pause state
+                    if event.key == pygame.K_F3:
+                        self.show_profiler = not self.show_profiler  # Toggle the profiler overlay
+                        self.profiler.enabled = self.show_profiler or self.profile
+                    if event.key == pygame.K_F4 and self.profiler.frames:
+                        self.profiler.export_chrome_trace(PROFILE_TRACE_PATH)
+                    if event.key == pygame.K_F5:
+                        print(self.memory_report())
+                    if event.key == pygame.K_F11:
+                        self.presenter.toggle_fullscreen()
+
+                if event.type == pygame.KEYUP:
+                    if event.key == pygame.K_LEFT:
+                        self.movement[0] = False
+                    if event.key == pygame.K_RIGHT:
+                        self.movement[1] = False
+                    if (event.key == pygame.K_UP or event.key == pygame.K_DOWN) and self.player.action == 'climb':
+                        self.player.velocity[1] = 0
+
+            # Handles climbing without additional key events for when the player is jumping up or falling down towards a ladder and holding keys down
+            self.keys = self.input.get_pressed()
+            if self.keys[pygame.K_UP] and self.player.action == 'climb':
+                self.player.velocity[1] = -1
+            if self.keys[pygame.K_DOWN] and self.player.action == 'climb':
+                self.player.velocity[1] = 1
+
+    def render(self, alpha=1.0):
+        """
+        Draw the current level to the display.
+
+        :param alpha: How far real time is between the previous tick (0) and the current one (1).
+        """
+        self.display.blit(self.current_background, (0, 0))
+        render_scroll = (int(self.prev_scroll[0] + (self.scroll[0] - self.prev_scroll[0]) * alpha),
+                         int(self.prev_scroll[1] + (self.scroll[1] - self.prev_scroll[1]) * alpha))
 
-        # Update and render clouds
-        self.clouds.update()
-        self.clouds.render(self.display, offset=render_scroll)
+        # Render clouds, tilemap and entities
+        with self.profiler.span('draw clouds'):
+            self.clouds.render(self.display, offset=render_scroll)
+        with self.profiler.span('draw tilemap'):
+            self.tilemap.render(self.display, offset=render_scroll)
 
-        # Render tilemap
-        self.tilemap.render(self.display, offset=render_scroll)
+        with self.profiler.span('draw entities'):
+            self.player.render(self.display, offset=render_scroll, alpha=alpha)
+            for enemy in self.activity.visible(self.enemies, render_scroll):
+                enemy.render(self.display, offset=render_scroll, alpha=alpha)
 
-        # Update and render player
-        self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
-        self.player.render(self.display, offset=render_scroll)
+        with self.profiler.span('draw particles'):
+            self.particles.render(self.display, offset=render_scroll)
 
-        for enemy in self.enemies:
-            enemy.update(self.tilemap)
-            enemy.render(self.display, offset=render_scroll)
-
-        # animate and render particles
-        for particle in self.particles.copy():
-            kill = particle.update()
-            particle.render(self.display, offset=render_scroll)
-            if isinstance(particle, Particle) and particle.type == 'leaf':
-                particle.pos[0] += math.sin(particle.animation_frame * 0.035) * 0.3
-                particle.pos[1] += math.sin(particle.animation_frame * 0.035) * 0.3
-            if kill:
-                self.particles.remove(particle)
-
-        # animate and render projectiles
-        for projectile in self.projectiles.copy():
-            kill = projectile.update()
-            projectile.render(self.display, offset=render_scroll)
-            if kill:
-                self.projectiles.remove(projectile)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    self.movement[0] = True
-                if event.key == pygame.K_RIGHT:
-                    self.movement[1] = True
-                if event.key == pygame.K_UP:
-                    if self.player.action == 'climb':
-                        self.player.velocity[1] = -1
-                    elif event.key == pygame.K_UP and self.player.action != 'jump':
-                        self.player.velocity[1] = -3
-                if event.key == pygame.K_DOWN:
-                    if self.player.action == 'climb':
-                        self.player.velocity[1] = 1
-                if event.key == pygame.K_SPACE and self.player.shuriken_cooldown == 0:
-                    if self.player.flip:
-                        self.projectiles.append(Shuriken(self, self.player.rect().center, velocity=[-2, 0]))
-                        self.player.throw_shuriken()
-                    else:
-                        self.projectiles.append(Shuriken(self, self.player.rect().center, velocity=[2, 0]))
-                        self.player.throw_shuriken()
-                if event.key == pygame.K_ESCAPE:
-                    self.is_paused = not self.is_paused  # Toggle pause state
-
-            if event.type == pygame.KEYUP:
-                if event.key == pygame.K_LEFT:
-                    self.movement[0] = False
-                if event.key == pygame.K_RIGHT:
-                    self.movement[1] = False
-                if (event.key == pygame.K_UP or event.key == pygame.K_DOWN) and self.player.action == 'climb':
-                    self.player.velocity[1] = 0
-
-        # Handles climbing without additional key events for when the player is jumping up or falling down towards a ladder and holding keys down
-        self.keys = pygame.key.get_pressed()
-        if self.keys[pygame.K_UP] and self.player.action == 'climb':
-            self.player.velocity[1] = -1
-        if self.keys[pygame.K_DOWN] and self.player.action == 'climb':
-            self.player.velocity[1] = 1
+        with self.profiler.span('draw projectiles'):
+            self.projectiles.render(self.display, offset=render_scroll, alpha=alpha)
 
         # Render the UI
-        self.ui.render(self.display)
-
-        self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-        pygame.display.update()
-        self.clock.tick(60)
-
-        self.check_level_completion()
+        with self.profiler.span('draw ui'):
+            self.ui.render(self.display)
 
-asyncio.run(Game().run())
+        if self.show_profiler:
+            self.profiler_overlay.render(self.display)
+
+    def present(self):
+        # Scale the low-res display up to the window
+        self.presenter.present(self.display)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ninja Platformer')
+    parser.add_argument('--headless', action='store_true', help='simulate without a window or audio (also NINJA_HEADLESS=1)')
+    parser.add_argument('--level', default='level1', help='level to simulate when headless')
+    parser.add_argument('--ticks', type=int, default=3600, help='ticks to simulate when headless')
+    parser.add_argument('--seed', type=int, help='seed for random')
+    parser.add_argument('--fps', type=int, default=MAX_FPS, help='render frame cap, 0 for uncapped')
+    parser.add_argument('--input', help='JSON key script to replay instead of the keyboard')
+    parser.add_argument('--profile', action='store_true', help='time every frame stage (also NINJA_PROFILE=1, F3 in game)')
+    parser.add_argument('--trace', help='write the profiled frames as Chrome trace JSON here after a headless run')
+    parser.add_argument('--memory', action='store_true', help='print resident surface memory per asset group after a headless run')
+    parser.add_argument('--renderer', action='store_true', help='scale frames up with an SDL renderer (also NINJA_RENDERER=1)')
+    parser.add_argument('--fullscreen', action='store_true', help='start fullscreen, F11 toggles it')
+    args, _ = parser.parse_known_args()
+
+    game = Game(headless=args.headless or None, seed=args.seed,
+                input_source=ScriptedInput.load(args.input) if args.input else None,
+                profile=args.profile or bool(args.trace) or None, max_fps=args.fps, load_async=True,
+                renderer=args.renderer or None, fullscreen=args.fullscreen)
+    if game.headless:
+        print(game.run_headless(args.level, args.ticks))
+        if args.trace:
+            game.profiler.export_chrome_trace(args.trace)
+        if args.memory:
+            print(game.memory_report())
+    else:
+        asyncio.run(game.run())
 
@@ -0,0 +1,68 @@
+import weakref
+
+import pygame
+
+ACTIVE_MARGIN = 128  # Around the view, entities here tick every tick. As far as an enemy can notice the player from
+IDLE_MARGIN = 384  # Past the active region up to here, entities tick every IDLE_INTERVAL ticks. Further out they sleep
+IDLE_INTERVAL = 4  # Idle entities then take one coarser step that covers all the ticks they skipped
+RENDER_MARGIN = 32  # How far sprites, health bars and exclamation marks reach past an entity's rect
+
+
+# Simulation level of detail around the camera. Entities near the view update every tick, ones further out
+# every few ticks, staggered so they don't all land on the same tick, and the rest sleep until the view comes
+# back. Which entities tick only depends on the camera and the tick count, so replays stay exact.
+class ActivityRegions:
+    def __init__(self, view_size, active_margin=ACTIVE_MARGIN, idle_margin=IDLE_MARGIN, idle_interval=IDLE_INTERVAL):
+        """
+        :param view_size: Size of the display the camera shows.
+        :param active_margin: Distance past the view that is always simulated.
+        :param idle_margin: Distance past the view that is simulated every idle_interval ticks.
+        :param idle_interval: Ticks between updates in the idle band.
+        """
+        self.view_size = view_size
+        self.active_margin = active_margin
+        self.idle_margin = idle_margin
+        self.idle_interval = idle_interval
+        self.tick = 0
+        self.phases = weakref.WeakKeyDictionary()  # Entity -> tick in the interval it updates on. Dead entities drop out
+        self.seen = 0  # Entities given a phase so far, the next one gets the next phase
+        self.counts = {'active': 0, 'idle': 0, 'asleep': 0}  # Last tick's entities per region
+
+    def view(self, scroll, margin=0):
+        return pygame.Rect(scroll[0] - margin, scroll[1] - margin,
+                           self.view_size[0] + margin * 2, self.view_size[1] + margin * 2)
+
+    def ticking(self, entities, scroll):
+        """
+        Pick the entities to update this tick. Call once per tick.
+
+        :param entities: All entities, in update order.
+        :param scroll: Camera position.
+        :return: List of (entity, ticks to cover) in the same order. Idle entities cover the whole interval.
+        """
+        self.tick += 1
+        active, idle = self.view(scroll, self.active_margin), self.view(scroll, self.idle_margin)
+        counts = {'active': 0, 'idle': 0, 'asleep': 0}
+        ticking = []
+        for entity in entities:
+            rect = entity.rect()
+            if active.colliderect(rect):
+                counts['active'] += 1
+                ticking.append((entity, 1))
+            elif idle.colliderect(rect):
+                counts['idle'] += 1
+                phase = self.phases.get(entity)
+                if phase is None:
+                    phase = self.phases[entity] = self.seen % self.idle_interval
+                    self.seen += 1
+                if self.tick % self.idle_interval == phase:
+                    ticking.append((entity, self.idle_interval))
+            else:
+                counts['asleep'] += 1
+        self.counts = counts
+        return ticking
+
+    def visible(self, entities, scroll):
+        # Entities that may show up in the view
+        view = self.view(scroll, RENDER_MARGIN)
+        return [entity for entity in entities if view.colliderect(entity.rect())]
@@ -0,0 +1,83 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+import pygame
+
+ASSET_WORKERS = 4  # Decoding threads
+LOAD_STEP_TIME = 0.01  # Seconds poll() decodes for, or waits for a worker to finish something, by default
+
+
+def find_files(root, extension):
+    # Every file under root with the extension, as '/' separated paths like load_image builds them
+    paths = []
+    for folder, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.endswith(extension):
+                paths.append(os.path.join(folder, name).replace(os.sep, '/'))
+    return sorted(paths)
+
+
+def decode_asset(path):
+    # Only decodes: converting images to the display format has to happen on the main thread (see utils.load_image)
+    if path.endswith('.ogg'):
+        return pygame.mixer.Sound(path)
+    return pygame.image.load(path)
+
+
+# Decodes image and sound files ahead of use on a thread pool, so the window can show progress meanwhile.
+# With workers=0 (e.g. the web build, which has no threads) files are decoded a few at a time in poll() instead.
+class AssetLoader:
+    def __init__(self, paths, workers=ASSET_WORKERS, tasks=None):
+        """
+        :param paths: Image and sound files to decode.
+        :param workers: Decoding threads, 0 to decode in poll() on the calling thread.
+        :param tasks: {name: function} of other slow work to run alongside, like repacking the atlas. The functions
+                      must not touch the display. Their results come back from results() under their names.
+        """
+        # Tasks first, then the biggest files, so nothing slow is left for last
+        self.jobs = list((tasks or {}).items())
+        self.jobs += [(path, partial(decode_asset, path)) for path in sorted(paths, key=os.path.getsize, reverse=True)]
+        self.decoded = {}
+        self.pool = ThreadPoolExecutor(workers) if workers else None
+        self.futures = [self.pool.submit(job) for _, job in self.jobs] if self.pool else []
+
+    def progress(self):
+        if self.pool:
+            done = sum(future.done() for future in self.futures)
+        else:
+            done = len(self.decoded)
+        return done / len(self.jobs) if self.jobs else 1.0
+
+    def done(self):
+        return self.progress() == 1.0
+
+    def poll(self, budget=LOAD_STEP_TIME):
+        """
+        Let loading move on while the caller keeps its window alive.
+
+        :param budget: Seconds to spend decoding here when there are no worker threads. With them, the longest to
+                       wait for the next job to finish. Returns as soon as one does.
+        :return: Fraction of files decoded.
+        """
+        if self.pool:
+            pending = [future for future in self.futures if not future.done()]
+            if pending:
+                wait(pending, timeout=budget, return_when=FIRST_COMPLETED)
+        else:
+            start = time.perf_counter()
+            while len(self.decoded) < len(self.jobs) and time.perf_counter() - start < budget:
+                name, job = self.jobs[len(self.decoded)]
+                self.decoded[name] = job()
+        return self.progress()
+
+    def results(self):
+        # Wait for everything and return {path: decoded Surface or Sound, task name: result}. Errors are raised here
+        if self.pool:
+            for (name, _), future in zip(self.jobs, self.futures):
+                self.decoded[name] = future.result()
+            self.pool.shutdown()
+            self.pool = None
+        else:
+            self.poll(budget=float('inf'))
+        return self.decoded
@@ -0,0 +1,94 @@
+import pygame
+from scripts.utils import Animation, load_image, load_images
+
+
+# Loaders for the asset table: each returns a function that does the actual load when the asset is first used
+def image(path):
+    return lambda: load_image(path)
+
+
+def images(path):
+    return lambda: load_images(path)
+
+
+def animation(path, **kwargs):
+    return lambda: Animation(load_images(path), **kwargs)
+
+
+def asset_surfaces(asset):
+    # Every Surface an image, image list or Animation holds
+    if isinstance(asset, pygame.Surface):
+        return [asset]
+    if isinstance(asset, Animation):
+        return list(asset.images)
+    return list(asset)
+
+
+def surface_bytes(surf):
+    return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+
+# Game assets by name, split into groups of assets that are needed together. Nothing is loaded until it is first used.
+# Levels hold a reference on every group they declare, and once no level holds a group its assets are released.
+class AssetManager:
+    def __init__(self, groups, on_load=None, on_release=None):
+        """
+        :param groups: {group: {asset name: loader}}, loaders as made by image(), images() and animation().
+        :param on_load: Called with (name, asset) after an asset is loaded.
+        :param on_release: Called with (name, asset) when an asset is released.
+        """
+        self.groups = groups
+        self.group_of = {name: group for group, loaders in groups.items() for name in loaders}
+        self.refs = {group: 0 for group in groups}
+        self.loaded = {}
+        self.on_load = on_load
+        self.on_release = on_release
+
+    def __getitem__(self, name):
+        asset = self.loaded.get(name)
+        if asset is None:
+            asset = self.groups[self.group_of[name]][name]()
+            self.loaded[name] = asset
+            if self.on_load:
+                self.on_load(name, asset)
+        return asset
+
+    def __contains__(self, name):
+        return name in self.group_of
+
+    def items(self):
+        # Only what is loaded
+        return self.loaded.items()
+
+    def acquire(self, groups):
+        for group in groups:
+            self.refs[group] += 1
+
+    def release(self, groups):
+        # Acquire the next level's groups before releasing the last one's, so shared groups stay loaded
+        for group in groups:
+            self.refs[group] -= 1
+        for name in [name for name in self.loaded if self.refs[self.group_of[name]] <= 0]:
+            asset = self.loaded.pop(name)
+            if self.on_release:
+                self.on_release(name, asset)
+
+    def memory_report(self):
+        """
+        Resident surface memory of every group.
+
+        :return: List of (group, assets loaded, assets in group, bytes in own surfaces, bytes in atlas subsurfaces).
+                 Atlas subsurfaces share their page's pixels, so their bytes stay resident with the page.
+        """
+        rows = []
+        for group, loaders in self.groups.items():
+            own = atlas = 0
+            loaded = [name for name in loaders if name in self.loaded]
+            for name in loaded:
+                for surf in asset_surfaces(self.loaded[name]):
+                    if surf.get_parent() is None:
+                        own += surface_bytes(surf)
+                    else:
+                        atlas += surface_bytes(surf)
+            rows.append((group, len(loaded), len(loaders), own, atlas))
+        return rows
@@ -0,0 +1,236 @@
+import argparse
+import hashlib
+import json
+import os
+import pygame
+
+ATLAS_VERSION = 1  # Bump whenever the page layout or manifest format changes
+ATLAS_DIR = 'graphics/atlas'
+ATLAS_PAGE_SIZE = 1024  # Largest page width and height. Smaller pages are used when everything fits on one
+ATLAS_PADDING = 1  # Empty pixels around every frame
+MAX_PACKED_SIZE = 128  # Images bigger than this either way, like the skies, stay separate files
+
+
+def manifest_path(directory):
+    return os.path.join(directory, 'atlas.json')
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def file_stat(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_manifest(directory):
+    try:
+        with open(manifest_path(directory)) as f:
+            manifest = json.load(f)
+        return manifest if manifest.get('version') == ATLAS_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def trim_rect(img):
+    # Bounding box of what is drawn, ignoring the black the game keys out
+    keyed = pygame.Surface(img.get_size(), 0, 32)
+    keyed.blit(img, (0, 0))
+    keyed.set_colorkey((0, 0, 0))
+    rects = pygame.mask.from_surface(keyed).get_bounding_rects()
+    if not rects:
+        return [0, 0, 0, 0]
+    rect = rects[0].unionall(rects[1:])
+    return [rect.x, rect.y, rect.width, rect.height]
+
+
+def pack(sizes, page_size=ATLAS_PAGE_SIZE, padding=ATLAS_PADDING):
+    """
+    Shelf-pack rectangles onto square pages, tallest first.
+
+    :param sizes: {key: (width, height)}.
+    :return: ({key: (page, x, y)}, page count).
+    """
+    placed = {}
+    page, x, y, shelf_height = 0, 0, 0, 0
+    for key, (width, height) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        width, height = width + padding * 2, height + padding * 2
+        if x + width > page_size:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        if y + height > page_size:
+            page, x, y, shelf_height = page + 1, 0, 0, 0
+        placed[key] = (page, x + padding, y + padding)
+        x += width
+        shelf_height = max(shelf_height, height)
+    return placed, page + 1 if placed else 0
+
+
+def page_path(directory, name):
+    return os.path.join(directory, name).replace(os.sep, '/')
+
+
+def source_stamps(sources, known):
+    # (hashes, stats) of every source. Only files whose size or mtime moved since the known entries get hashed again
+    hashes, stats = {}, {}
+    for path in sources:
+        stats[path] = file_stat(path)
+        entry = known.get(path)
+        hashes[path] = entry['hash'] if entry and entry['stat'] == stats[path] else file_hash(path)
+    return hashes, stats
+
+
+def check_atlas(sources, directory=ATLAS_DIR):
+    """
+    Find out if the atlas on disk holds the current sources, without decoding any image.
+
+    :param sources: Image paths the atlas should hold.
+    :param directory: Directory of the page PNGs and atlas.json.
+    :return: The manifest when the atlas is current, otherwise None.
+    """
+    old = load_manifest(directory)
+    if old is None:
+        return None
+    known = dict(old['frames'], **old['skipped'])
+    hashes, stats = source_stamps(sources, known)
+    if set(known) != set(sources) or any(known[path]['hash'] != hashes[path] for path in sources):
+        return None
+    if not all(os.path.exists(os.path.join(directory, page)) for page in old['pages']):
+        return None
+    if any(known[path]['stat'] != stats[path] for path in sources):
+        # Same content with new mtimes, e.g. after a checkout. Remember them so the next run skips hashing
+        for path in sources:
+            known[path]['stat'] = stats[path]
+        save_manifest(directory, old)
+    return old
+
+
+def pack_atlas(sources, directory=ATLAS_DIR):
+    """
+    Decode and pack images into atlas pages. Doesn't convert anything, so it may run on a worker thread.
+
+    :param sources: Image paths to pack. Ones bigger than MAX_PACKED_SIZE are left out.
+    :param directory: Directory the pages are meant for, used in their paths.
+    :return: (manifest, {page path: page Surface}).
+    """
+    old = load_manifest(directory) or {'frames': {}, 'skipped': {}}
+    hashes, stats = source_stamps(sources, dict(old['frames'], **old['skipped']))
+
+    images = {path: pygame.image.load(path) for path in sources}
+    packed = {path: img.get_size() for path, img in images.items()
+              if img.get_width() <= MAX_PACKED_SIZE and img.get_height() <= MAX_PACKED_SIZE}
+    # Empty page area still costs decode time, so use the smallest power of two that holds everything
+    page_size = 64
+    placed, page_count = pack(packed, page_size)
+    while page_count > 1 and page_size < ATLAS_PAGE_SIZE:
+        page_size *= 2
+        placed, page_count = pack(packed, page_size)
+
+    pages = [pygame.Surface((page_size, page_size), 0, 32) for _ in range(page_count)]
+    manifest = {'version': ATLAS_VERSION, 'page_size': page_size, 'pages': [f'page{i}.png' for i in range(page_count)],
+                'frames': {}, 'skipped': {}}
+    for path, img in images.items():
+        if path not in placed:
+            manifest['skipped'][path] = {'hash': hashes[path], 'stat': stats[path]}
+            continue
+        page, x, y = placed[path]
+        # Copy the colour channels as they are, like convert() does when loading the file on its own
+        img.set_alpha(None)
+        pages[page].blit(img, (x, y))
+        manifest['frames'][path] = {'page': page, 'rect': [x, y, img.get_width(), img.get_height()],
+                                    'trim': trim_rect(img), 'hash': hashes[path], 'stat': stats[path]}
+    return manifest, {page_path(directory, name): page for name, page in zip(manifest['pages'], pages)}
+
+
+def save_atlas(directory, manifest, pages):
+    # Write the pages, then the manifest. False when they couldn't be written, e.g. a read-only install
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for name in manifest['pages']:
+            pygame.image.save(pages[page_path(directory, name)], os.path.join(directory, name))
+    except (OSError, pygame.error):
+        return False
+    # Written last, so an interrupted build is seen as stale and redone
+    return save_manifest(directory, manifest)
+
+
+def rebuild_atlas(sources, directory=ATLAS_DIR):
+    """
+    Repack and save the atlas. Meant for a worker thread when check_atlas() found it stale.
+
+    :return: (manifest, {page path: page Surface}), usable for this run even if saving failed.
+    """
+    manifest, pages = pack_atlas(sources, directory)
+    save_atlas(directory, manifest, pages)
+    return manifest, pages
+
+
+def build_atlas(sources, directory=ATLAS_DIR, force=False):
+    """
+    Pack images into atlas pages with a JSON manifest, unless the current ones already hold the same files.
+
+    :param sources: Image paths to pack. Ones bigger than MAX_PACKED_SIZE are left out.
+    :param directory: Directory for the page PNGs and atlas.json.
+    :param force: Repack even when nothing changed.
+    :return: The manifest, or None if the atlas is stale and couldn't be written (e.g. a read-only install).
+    """
+    manifest = None if force else check_atlas(sources, directory)
+    if manifest is not None:
+        return manifest
+    manifest, pages = pack_atlas(sources, directory)
+    return manifest if save_atlas(directory, manifest, pages) else None
+
+
+def save_manifest(directory, manifest):
+    try:
+        with open(manifest_path(directory), 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        return True
+    except OSError:
+        return False
+
+
+# A built atlas at runtime: which files to decode for its pages and how to cut them back into frames
+class Atlas:
+    def __init__(self, manifest, directory=ATLAS_DIR):
+        self.manifest = manifest
+        self.page_paths = [page_path(directory, page) for page in manifest['pages']]
+
+    def __contains__(self, path):
+        return path in self.manifest['frames']
+
+    def trim(self, path):
+        # (x, y, width, height) of the drawn part of a packed frame, relative to the frame
+        return tuple(self.manifest['frames'][path]['trim'])
+
+    def frames(self, decoded=None):
+        """
+        Convert the pages and cut them into frames. Main thread only.
+
+        :param decoded: {path: Surface} of pages already decoded, e.g. by an AssetLoader. Others are read here.
+        :return: {source path: subsurface of its page}, keyed out on black like load_image.
+        """
+        decoded = decoded or {}
+        pages = []
+        for path in self.page_paths:
+            page = decoded.get(path)
+            page = (page if page is not None else pygame.image.load(path)).convert()
+            page.set_colorkey((0, 0, 0))
+            pages.append(page)
+        return {path: pages[frame['page']].subsurface(frame['rect']) for path, frame in self.manifest['frames'].items()}
+
+
+if __name__ == '__main__':
+    # Run from the repository root: python -m scripts.atlas
+    from scripts.asset_loader import find_files
+
+    parser = argparse.ArgumentParser(description='Pack the sprite frames into atlas pages')
+    parser.add_argument('--force', action='store_true', help='repack even if no source changed')
+    args = parser.parse_args()
+
+    sources = find_files('graphics/animations_spritesheet', '.png') + find_files('graphics/spritesheet_images', '.png')
+    manifest = build_atlas(sources, force=args.force)
+    if manifest is None:
+        raise SystemExit(f'Could not write the atlas to {ATLAS_DIR}')
+    print(f"{len(manifest['frames'])} frames on {len(manifest['pages'])} page(s), {len(manifest['skipped'])} images left separate")
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+import numpy as np
+import pygame
+
+
+# Pixel-space queries for any index that can answer query_cells() over tile cells of tile_size pixels
+class CellQueries(ABC):
+    tile_size = 16
+
+    @abstractmethod
+    def query_cells(self, start_x, end_x, start_y, end_y):
+        """
+        :return: Tuple of (column spans, row spans) covering a cell range, in map order.
+        """
+
+    def query(self, rect):
+        """
+        Find the spans near an area, including the cells just past its right and bottom edges.
+
+        :param rect: Area to look around as (x, y, width, height) in pixels.
+        :return: Tuple of (column spans, row spans) as shared pygame.Rect, in map order.
+        """
+        x, y, w, h = rect
+        return self.query_cells(int(x // self.tile_size), int((x + w) // self.tile_size) + 1,
+                                int(y // self.tile_size), int((y + h) // self.tile_size) + 1)
+
+    def collides(self, rect):
+        rect = pygame.Rect(rect)
+        return rect.collidelist(self.query(rect)[1]) != -1
+
+
+# Static collision index over a tile mask, built once at load. Set cells are merged greedily into
+# horizontal spans per row and vertical spans per column, and every cell points at the spans covering it.
+# Horizontal movement resolves against column spans and vertical movement against row spans, which gives
+# the same result as resolving against each tile. The rects are shared: callers must not mutate them.
+class CollisionIndex(CellQueries):
+    def __init__(self, mask, tile_size=16, origin=(0, 0)):
+        self.tile_size = tile_size
+        self.origin = origin  # Map cell of the mask's top left corner
+        self.height, self.width = mask.shape
+        self.rows, row_cells = self.merge_runs(mask)
+        self.columns, column_cells = self.merge_runs(mask.T)
+        self.columns = [pygame.Rect(rect.y, rect.x, rect.height, rect.width) for rect in self.columns]
+        if origin != (0, 0):
+            self.rows = self._move_to_origin(self.rows)
+            self.columns = self._move_to_origin(self.columns)
+
+        # Nested lists slice faster than small NumPy views for the handful of cells a query touches
+        self.row_cells = row_cells.tolist()
+        self.column_cells = column_cells.T.tolist()
+
+    def merge_runs(self, mask):
+        rects = []
+        cells = np.full(mask.shape, -1, dtype=np.int32)
+        for y, row in enumerate(mask):
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], row.astype(np.int8), [0]))))
+            for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                cells[y, start:end] = len(rects)
+                rects.append(pygame.Rect(start * self.tile_size, y * self.tile_size, (end - start) * self.tile_size, self.tile_size))
+        return rects, cells
+
+    def _move_to_origin(self, rects):
+        return [rect.move(self.origin[0] * self.tile_size, self.origin[1] * self.tile_size) for rect in rects]
+
+    def _spans(self, rects, cells, start_x, end_x, start_y, end_y):
+        rect_ids = set()
+        for row in cells[start_y:end_y]:
+            rect_ids.update(row[start_x:end_x])
+        rect_ids.discard(-1)
+        return [rects[rect_id] for rect_id in sorted(rect_ids)]
+
+    def query_cells(self, start_x, end_x, start_y, end_y):
+        start_x, end_x = start_x - self.origin[0], end_x - self.origin[0]
+        start_y, end_y = start_y - self.origin[1], end_y - self.origin[1]
+        start_x, end_x = max(start_x, 0), min(end_x, self.width)
+        start_y, end_y = max(start_y, 0), min(end_y, self.height)
+        if start_x >= end_x or start_y >= end_y:
+            return [], []
+        return (self._spans(self.columns, self.column_cells, start_x, end_x, start_y, end_y),
+                self._spans(self.rows, self.row_cells, start_x, end_x, start_y, end_y))
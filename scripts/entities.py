@@ -1,9 +1,7 @@
 import pygame
 import random
 import asyncio
-from scripts.projectiles import RedShuriken
 from scripts.tilemap import Tilemap
-from scripts.particle import SkullParticle  # Import SkullParticle
 
 
 # Base class for all entities that have physics properties
@@ -21,27 +19,45 @@ class PhysicsEntity:
         self.anim_offset = (0, 0)  # Offset for the animation
         self.flip = False  # Flag for flipping the sprite horizontally
         self.knockback = pygame.Vector2(0, 0)  # Initialize knockback vector
+        self.prev_pos = list(self.pos)  # Position at the previous tick, for render interpolation
         self.set_action('idle')  # Set the initial action to 'idle'
 
     def rect(self):
         return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
 
+    def render_pos(self, alpha=1.0):
+        # Position between the previous tick (alpha 0) and the current one (alpha 1)
+        return (self.prev_pos[0] + (self.pos[0] - self.prev_pos[0]) * alpha,
+                self.prev_pos[1] + (self.pos[1] - self.prev_pos[1]) * alpha)
+
     def set_action(self, action):
         if action != self.action:
             self.action = action
             self.animation = self.game.assets[self.type + '/' + self.action].copy()
 
-    def update(self, tilemap, movement=(0, 0)):
-        self.collisions = {'up': False, 'down': False, 'left': False, 'right': False}  # Reset collision flags
+    def update(self, tilemap, movement=(0, 0), ticks=1):
+        # ticks > 1 covers several ticks in one coarser step, for entities far from the camera that only update
+        # every few ticks. They catch up on the skipped ticks so they keep their speed and don't hang in the air
         frame_movement = [movement[0] + self.velocity[0], movement[1] + self.velocity[1]]  # Calculate frame movement
+        if ticks > 1 and max(abs(frame_movement[0]), abs(frame_movement[1])) * ticks > tilemap.tile_size:
+            # A step this long could carry the entity through a whole tile, take the ticks one by one instead
+            for _ in range(ticks):
+                PhysicsEntity.update(self, tilemap, movement)
+            return
+
+        self.collisions = {'up': False, 'down': False, 'left': False, 'right': False}  # Reset collision flags
+        frame_movement = [frame_movement[0] * ticks, frame_movement[1] * ticks]
 
         if self.velocity[0] != 0:
-            self.velocity[0] *= 0.9  # Dampen horizontal velocity over time
+            self.velocity[0] *= 0.9 ** ticks  # Dampen horizontal velocity over time
+
+        # One query over the swept box covers the collision checks for both axes
+        column_rects, row_rects = tilemap.physics_spans_around(self.pos, self.size, frame_movement)
 
         # Update horizontal position and check for collisions
         self.pos[0] += frame_movement[0]
         entity_rect = self.rect()
-        for rect in tilemap.physics_rects_around(self.pos, self.size):
+        for rect in column_rects:
             if entity_rect.colliderect(rect):
                 if frame_movement[0] > 0:
                     entity_rect.right = rect.left
@@ -54,7 +70,7 @@ class PhysicsEntity:
         # Update vertical position and check for collisions
         self.pos[1] += frame_movement[1]
         entity_rect = self.rect()
-        for rect in tilemap.physics_rects_around(self.pos, self.size):
+        for rect in row_rects:
             if entity_rect.colliderect(rect):
                 if frame_movement[1] > 0:
                     entity_rect.bottom = rect.top
@@ -72,30 +88,33 @@ class PhysicsEntity:
 
         # Apply gravity if not climbing
         if self.action != 'climb':
-            self.velocity[1] = min(15, self.velocity[1] + 0.1)
+            self.velocity[1] = min(15, self.velocity[1] + 0.1 * ticks)
 
         # Reset vertical velocity on collision with ground or ceiling
         if self.collisions['down'] or self.collisions['up']:
             self.velocity[1] = 0
 
-        self.animation.update()  # Update animation
+        for _ in range(ticks):
+            self.animation.update()  # Update animation
 
-    def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0],
-                   self.pos[1] - offset[1] + self.anim_offset[1]))
-        self.draw_health_bar(surf, offset)  # Draw health bar
+    def render(self, surf, offset=(0, 0), alpha=1.0):
+        pos = self.render_pos(alpha)
+        surf.blit(self.game.transforms.get(self.animation.img(), self.flip),
+                  (pos[0] - offset[0] + self.anim_offset[0],
+                   pos[1] - offset[1] + self.anim_offset[1]))
+        self.draw_health_bar(surf, offset, pos)  # Draw health bar
 
-    def draw_health_bar(self, surf, offset):
+    def draw_health_bar(self, surf, offset, pos=None):
+        pos = pos or self.pos
         if self.health < self.max_health:
             health_bar_width = self.size[0]
             health_bar_height = 4
             health_ratio = self.health / self.max_health
             pygame.draw.rect(surf, (255, 0, 0),
-                             (self.pos[0] - offset[0], self.pos[1] - offset[1] - 6,
+                             (pos[0] - offset[0], pos[1] - offset[1] - 6,
                               health_bar_width, health_bar_height))
             pygame.draw.rect(surf, (0, 255, 0),
-                             (self.pos[0] - offset[0], self.pos[1] - offset[1] - 6,
+                             (pos[0] - offset[0], pos[1] - offset[1] - 6,
                               health_bar_width * health_ratio, health_bar_height))
 
 
@@ -121,10 +140,9 @@ class Player(PhysicsEntity):
             if entity_rect.colliderect(ladder):
                 if self.action != 'climb':
                     self.velocity[1] = 0
-                    if self.action != 'climb':
-                        self.game.audio['climbing'].play(loops=-1)
                     self.set_action('climb')
-                    self.game.audio['walking'].stop()
+                self.game.sfx.loop('climbing', True)
+                self.game.sfx.loop('walking', False)
                 return
 
         self.air_time += 1
@@ -133,18 +151,13 @@ class Player(PhysicsEntity):
 
         # Set appropriate action based on state
         if self.air_time > 4 and self.action != 'climb':
-            self.game.audio['climbing'].stop()
-            self.game.audio['walking'].stop() 
             self.set_action('jump')
         elif movement[0] != 0:
-            if self.action != 'run':
-                self.game.audio['climbing'].stop()
-                self.game.audio['walking'].play(loops=-1)
-            self.set_action('run') # Play footsteps sound
+            self.set_action('run')
         else:
             self.set_action('idle')
-            self.game.audio['climbing'].stop()
-            self.game.audio['walking'].stop()  # Stop footsteps sound
+        self.game.sfx.loop('climbing', False)
+        self.game.sfx.loop('walking', self.action == 'run')  # Footsteps while running
 
         # Apply knockback to movement
         if self.knockback.length() > 0:
@@ -173,21 +186,22 @@ class Player(PhysicsEntity):
             self.health = 0  # Ensure health doesn't go below 0
             self.die()  # Player dies when health is zero
             return
-        self.game.audio['damage'].play() 
+        self.game.sfx.play('damage')
 
     def throw_shuriken(self):
         self.shuriken_cooldown = 60  # Set cooldown to 60 frames (1 second)
-        self.game.audio['shuriken_throw'].play()  # Play shuriken throw sound
+        self.game.sfx.play('shuriken_throw')  # Play shuriken throw sound
 
     def die(self):
         self.health = 0  # Ensure health doesn't go below 0
         self.dead = True  # Set the player as dead
 
     # Override the render method and add custom offset for player sprite
-    def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0] - 5,
-                   self.pos[1] - offset[1] + self.anim_offset[1]))
+    def render(self, surf, offset=(0, 0), alpha=1.0):
+        pos = self.render_pos(alpha)
+        surf.blit(self.game.transforms.get(self.animation.img(), self.flip),
+                  (pos[0] - offset[0] + self.anim_offset[0] - 5,
+                   pos[1] - offset[1] + self.anim_offset[1]))
 
 
 # Class for enemy characters, inherits from PhysicsEntity
@@ -214,16 +228,18 @@ class Enemy(PhysicsEntity):
         self.health -= damage
         if self.health <= 0:
             self.health = 0
-            self.game.audio['death'].play()  # Play enemy death sound
+            self.game.sfx.play('death')  # Play enemy death sound
             self.game.enemies.remove(self)
-            self.game.particles.append(SkullParticle(self.game, (self.pos[0] + self.size[0] / 2, self.pos[1])))  # Add skull particle
+            self.game.spatial_hash.remove(self)
+            self.game.particles.emit('skull', (self.pos[0] + self.size[0] / 2, self.pos[1]), velocity=(0, -0.3))  # Add skull particle
             return
-        self.game.audio['damage'].play()
+        self.game.sfx.play('damage')
 
-    def update(self, tilemap, movement=(0, 0)):
+    def update(self, tilemap, movement=(0, 0), ticks=1):
         # Check for dying from falling too fast
         if self.velocity[1] >= 15:
             self.game.enemies.remove(self)
+            self.game.spatial_hash.remove(self)
             return
 
         # Move towards the player only if within 8 tiles horizontally (128 pixels) and 4 tiles vertically (64 pixels)
@@ -257,23 +273,19 @@ class Enemy(PhysicsEntity):
 
         # Update exclamation point counter
         if self.exclamation_counter > 0:
-            self.exclamation_counter -= 1
+            self.exclamation_counter = max(0, self.exclamation_counter - ticks)
         else:
             self.exclamation_shown = False
 
         # Apply knockback to movement
         if self.knockback.length() > 0:
             movement = (movement[0] + self.knockback.x, movement[1] + self.knockback.y)
-            self.knockback *= 0.9  # Dampen knockback over time
+            self.knockback *= 0.9 ** ticks  # Dampen knockback over time
             if self.knockback.length() < 0.1:
                 self.knockback = pygame.Vector2(0, 0)  # Stop knockback if it's very small
 
         next_pos = [self.pos[0] + movement[0] * 16, self.pos[1] + self.size[1]]
-        on_ground = False
-        for rect in tilemap.physics_rects_around(next_pos, self.size):
-            if pygame.Rect(next_pos[0], next_pos[1], self.size[0], 1).colliderect(rect):
-                on_ground = True
-                break
+        on_ground = tilemap.solid_collides(pygame.Rect(next_pos[0], next_pos[1], self.size[0], 1))
 
         # Prevent movement in the direction of the ledge
         if not on_ground and self.knockback == (0, 0):
@@ -288,14 +300,14 @@ class Enemy(PhysicsEntity):
             self.game.player.take_damage(5, knockback)  # Apply damage and knockback to the player
 
         # Check for collision with other enemies
-        for enemy in self.game.enemies:
+        for enemy in self.game.spatial_hash.neighbors(self, self.size[0]):
             if enemy != self and self.rect().colliderect(enemy.rect()) and self.knockback.length() < 0.1:
                 if self.pos[0] < enemy.pos[0]:
                     self.pos[0] = enemy.pos[0] - self.size[0]
                 elif self.pos[0] > enemy.pos[0]:
                     self.pos[0] = enemy.pos[0] + self.size[0]
 
-        super().update(tilemap, movement=movement)  # Update position and handle collisions
+        super().update(tilemap, movement=movement, ticks=ticks)  # Update position and handle collisions
 
         if movement[0] != 0:
             self.set_action('run')
@@ -304,17 +316,18 @@ class Enemy(PhysicsEntity):
         else:
             self.set_action('idle')
 
-    def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0] - 5,
-                   self.pos[1] - offset[1] + self.anim_offset[1]))
-        self.draw_health_bar(surf, offset)  # Draw health bar
+    def render(self, surf, offset=(0, 0), alpha=1.0):
+        pos = self.render_pos(alpha)
+        surf.blit(self.game.transforms.get(self.animation.img(), self.flip),
+                  (pos[0] - offset[0] + self.anim_offset[0] - 5,
+                   pos[1] - offset[1] + self.anim_offset[1]))
+        self.draw_health_bar(surf, offset, pos)  # Draw health bar
 
         # Render the exclamation point if it should be shown
         if self.exclamation_shown:
             exclamation_img = self.game.assets['exclamation']  # Load the exclamation point image
-            surf.blit(exclamation_img, (self.pos[0] - offset[0] + self.size[0] // 2 - exclamation_img.get_width() // 2,
-                                        self.pos[1] - offset[1] - exclamation_img.get_height() - 10))  # Position it above the enemy's head
+            surf.blit(exclamation_img, (pos[0] - offset[0] + self.size[0] // 2 - exclamation_img.get_width() // 2,
+                                        pos[1] - offset[1] - exclamation_img.get_height() - 10))  # Position it above the enemy's head
 
 
 # Class for boss characters, inherits from PhysicsEntity
@@ -337,16 +350,18 @@ class Boss(PhysicsEntity):
         self.health -= damage
         if self.health <= 0:
             self.health = 0
-            self.game.audio['death'].play()
+            self.game.sfx.play('death')
             self.game.enemies.remove(self)
-            self.game.particles.append(SkullParticle(self.game, (self.pos[0] + self.size[0] / 2, self.pos[1])))  # Add skull particle
+            self.game.spatial_hash.remove(self)
+            self.game.particles.emit('skull', (self.pos[0] + self.size[0] / 2, self.pos[1]), velocity=(0, -0.3))  # Add skull particle
             return
-        self.game.audio['damage'].play()
+        self.game.sfx.play('damage')
 
-    def update(self, tilemap, movement=(0, 0)):
+    def update(self, tilemap, movement=(0, 0), ticks=1):
         # Check for dying from falling too fast
         if self.velocity[1] >= 15:
             self.game.enemies.remove(self)
+            self.game.spatial_hash.remove(self)
             return
 
         # Move towards the player only if within 8 tiles horizontally (128 pixels) and 4 tiles vertically (64 pixels)
@@ -380,14 +395,14 @@ class Boss(PhysicsEntity):
 
         # Update exclamation point counter
         if self.exclamation_counter > 0:
-            self.exclamation_counter -= 1
+            self.exclamation_counter = max(0, self.exclamation_counter - ticks)
         else:
             self.exclamation_shown = False
 
         # Apply knockback to movement
         if self.knockback.length() > 0:
             movement = (movement[0] + self.knockback.x, movement[1] + self.knockback.y)
-            self.knockback *= 0.9  # Dampen knockback over time
+            self.knockback *= 0.9 ** ticks  # Dampen knockback over time
             if self.knockback.length() < 0.1:
                 self.knockback = pygame.Vector2(0, 0)  # Stop knockback if it's very small
 
@@ -396,14 +411,10 @@ class Boss(PhysicsEntity):
             self.special_attack()
             self.special_attack_cooldown = 100
         elif self.special_attack_cooldown > 0:
-            self.special_attack_cooldown -= 1
+            self.special_attack_cooldown = max(0, self.special_attack_cooldown - ticks)
 
         next_pos = [self.pos[0] + movement[0] * 16, self.pos[1] + self.size[1]]
-        on_ground = False
-        for rect in tilemap.physics_rects_around(next_pos, self.size):
-            if pygame.Rect(next_pos[0], next_pos[1], self.size[0], 1).colliderect(rect):
-                on_ground = True
-                break
+        on_ground = tilemap.solid_collides(pygame.Rect(next_pos[0], next_pos[1], self.size[0], 1))
 
         # Prevent movement in the direction of the ledge
         if not on_ground and self.knockback == (0, 0):
@@ -418,14 +429,14 @@ class Boss(PhysicsEntity):
             self.game.player.take_damage(5, knockback)  # Apply damage and knockback to the player
 
         # Check for collision with other enemies
-        for enemy in self.game.enemies:
+        for enemy in self.game.spatial_hash.neighbors(self, self.size[0]):
             if enemy != self and self.rect().colliderect(enemy.rect()) and self.knockback.length() < 0.1:
                 if self.pos[0] < enemy.pos[0]:
                     self.pos[0] = enemy.pos[0] - self.size[0]
                 elif self.pos[0] > enemy.pos[0]:
                     self.pos[0] = enemy.pos[0] + self.size[0]
 
-        super().update(tilemap, movement=movement)  # Update position and handle collisions
+        super().update(tilemap, movement=movement, ticks=ticks)  # Update position and handle collisions
 
         # Update action based on movement
         if movement[0] != 0:
@@ -440,21 +451,21 @@ class Boss(PhysicsEntity):
         player_pos = self.game.player.pos
         direction = pygame.Vector2(player_pos[0] - self.pos[0], player_pos[1] - self.pos[1]).normalize()
         projectile_pos = (self.pos[0] + self.size[0] // 2, self.pos[1] + self.size[1] // 2)
-        new_projectile = RedShuriken(self.game, projectile_pos, direction)
-        self.game.projectiles.append(new_projectile)
+        self.game.projectiles.emit('red_shuriken', projectile_pos, direction)
 
-    def render(self, surf, offset=(0, 0)):
+    def render(self, surf, offset=(0, 0), alpha=1.0):
+        pos = self.render_pos(alpha)
         # draw hitbox
         # hitbox = self.rect().move(-offset[0], -offset[1])
         # pygame.draw.rect(surf, (0, 255, 0), hitbox, 1)
 
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0] - 9,
-                   self.pos[1] - offset[1] + self.anim_offset[1]))
-        self.draw_health_bar(surf, offset)  # Draw health bar
+        surf.blit(self.game.transforms.get(self.animation.img(), self.flip),
+                  (pos[0] - offset[0] + self.anim_offset[0] - 9,
+                   pos[1] - offset[1] + self.anim_offset[1]))
+        self.draw_health_bar(surf, offset, pos)  # Draw health bar
 
         # Render the exclamation point if it should be shown
         if self.exclamation_shown:
             exclamation_img = self.game.assets['exclamation']  # Load the exclamation point image
-            surf.blit(exclamation_img, (self.pos[0] - offset[0] + self.size[0] // 2 - exclamation_img.get_width() // 2,
-                                        self.pos[1] - offset[1] - exclamation_img.get_height() - 10))  # Position it above the enemy's head
+            surf.blit(exclamation_img, (pos[0] - offset[0] + self.size[0] // 2 - exclamation_img.get_width() // 2,
+                                        pos[1] - offset[1] - exclamation_img.get_height() - 10))  # Position it above the enemy's head
@@ -0,0 +1,74 @@
+import json
+from collections import defaultdict
+import pygame
+
+
+# Reads the real keyboard and mouse through pygame
+class LiveInput:
+    def __init__(self):
+        self.pending = []  # Event wait() woke up on, handed out ahead of the queue
+
+    def get_events(self):
+        events = self.pending + pygame.event.get()
+        self.pending = []
+        for i, event in enumerate(events):
+            # SDL only quits by itself when the last window closes, and the renderer presenter keeps a hidden one
+            if event.type == pygame.WINDOWCLOSE:
+                events[i] = pygame.event.Event(pygame.QUIT)
+        return events
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+    def wait(self, timeout):
+        # Sleep until an event arrives or timeout seconds pass. The event is kept for get_events(), in its place
+        # before anything queued since. Posting it back would put it behind those and could reorder key presses
+        if self.pending:
+            return
+        event = pygame.event.wait(int(timeout * 1000))
+        if event.type != pygame.NOEVENT:
+            self.pending.append(event)
+
+
+# Replays key presses from a script, one get_events() call per tick. Each entry is (tick, 'down' or 'up', key)
+# with key named like the pygame constant without K_ (e.g. 'LEFT', 'SPACE'). With loop set, the script repeats every loop ticks.
+class ScriptedInput:
+    def __init__(self, script=(), loop=None):
+        self.loop = loop
+        self.script = defaultdict(list)
+        for tick, action, key in script:
+            event_type = pygame.KEYDOWN if action == 'down' else pygame.KEYUP
+            self.script[tick].append(pygame.event.Event(event_type, key=getattr(pygame, f'K_{key}')))
+        self.tick = 0
+        self.held = set()
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a script from a JSON file.
+
+        :param path: File holding either a list of [tick, action, key] entries or {"loop": ticks, "events": [...]}.
+        :return: ScriptedInput replaying the file.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return cls(data['events'], data.get('loop'))
+        return cls(data)
+
+    def get_events(self):
+        tick = self.tick % self.loop if self.loop else self.tick
+        events = self.script.get(tick, [])
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                self.held.add(event.key)
+            else:
+                self.held.discard(event.key)
+        self.tick += 1
+        return events
+
+    def get_pressed(self):
+        return defaultdict(bool, {key: True for key in self.held})
+
+    def wait(self, timeout):
+        pass  # Scripted events are due every call, there is nothing to wait for
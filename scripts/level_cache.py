@@ -0,0 +1,160 @@
+import hashlib
+import os
+import re
+import zipfile
+import numpy as np
+
+# Bump whenever the compiled layout or the way TMX layers are turned into grids changes
+LEVEL_CACHE_VERSION = 2
+# What reading a missing, stale or damaged (e.g. truncated) cache file raises. All of them mean: rebuild it
+CACHE_ERRORS = (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile)
+
+
+def compiled_path(tmx_path):
+    return os.path.splitext(tmx_path)[0] + '.npz'
+
+
+def source_hash(tmx_path):
+    # Hash the TMX together with every external TSX it references, so editing either rebuilds the cache
+    digest = hashlib.sha1(str(LEVEL_CACHE_VERSION).encode())
+    with open(tmx_path, 'rb') as f:
+        tmx = f.read()
+    digest.update(tmx)
+    for source in re.findall(rb'<tileset[^>]*\bsource="([^"]+)"', tmx):
+        with open(os.path.join(os.path.dirname(tmx_path), source.decode()), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def write_atomic(path, write):
+    """
+    Write a file through a temporary file in the same directory, so it is either the old file or the whole new one.
+
+    :param path: Final path of the file.
+    :param write: Called with the open temporary file.
+    """
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_compiled(path, expected_hash):
+    """
+    Load a compiled level if it exists and was built from the current sources.
+
+    :param path: Path of the compiled .npz file.
+    :param expected_hash: source_hash() of the level's TMX/TSX files.
+    :return: Dict of level data, or None when the cache is missing or stale.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['source_hash']) != expected_hash:
+                return None
+            level = _level_data(data)
+            level['layers'] = data['layers']
+            return level
+    except CACHE_ERRORS:
+        return None
+
+
+def _level_arrays(source, level):
+    return {
+        'source_hash': np.array(source),
+        'layer_names': np.array(level['layer_names'], dtype=str),
+        'tile_types': np.array([tile[0] for tile in level['tiles']], dtype=str),
+        'tile_variants': np.array([tile[1] for tile in level['tiles']], dtype=np.int32),
+        'tile_solid': np.array([tile[2] for tile in level['tiles']], dtype=bool),
+        'tile_ladder': np.array([tile[3] for tile in level['tiles']], dtype=bool),
+        'player_position': np.array(level['player_position'], dtype=np.int32),
+        'enemy_positions': np.array(level['enemy_positions'], dtype=np.int32).reshape(-1, 2),
+        'boss_positions': np.array(level['boss_positions'], dtype=np.int32).reshape(-1, 2),
+    }
+
+
+def _level_data(data):
+    return {
+        'layer_names': data['layer_names'].tolist(),
+        'tiles': list(zip(data['tile_types'].tolist(), data['tile_variants'].tolist(), data['tile_solid'].tolist(), data['tile_ladder'].tolist())),
+        'player_position': tuple(data['player_position'].tolist()),
+        'enemy_positions': [tuple(pos) for pos in data['enemy_positions'].tolist()],
+        'boss_positions': [tuple(pos) for pos in data['boss_positions'].tolist()],
+    }
+
+
+def save_compiled(path, source, level):
+    # A read-only install (e.g. the web build) just keeps loading from the TMX
+    try:
+        write_atomic(path, lambda f: np.savez(f, layers=level['layers'], **_level_arrays(source, level)))
+    except OSError:
+        pass
+
+
+def chunks_path(tmx_path):
+    return os.path.splitext(tmx_path)[0] + '.chunks'
+
+
+def save_chunks(directory, source, level, chunk_size):
+    """
+    Split a level's grids into one file per non-empty chunk for the streaming tilemap.
+
+    :param directory: Directory to write meta.npz and the <cx>_<cy>.npy chunk files to.
+    :param source: source_hash() of the level's TMX/TSX files.
+    :param level: Level data as load_compiled returns it, including the full 'layers' grid.
+    :param chunk_size: Chunk width and height in tiles.
+    :return: True if the chunks were written.
+    """
+    layers = level['layers']
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # The meta file goes first, so an interrupted clean-up is seen as stale too
+        for name in sorted(os.listdir(directory), key=lambda name: name != 'meta.npz'):
+            os.remove(os.path.join(directory, name))
+        for cy in range(-(-layers.shape[1] // chunk_size)):
+            for cx in range(-(-layers.shape[2] // chunk_size)):
+                block = layers[:, cy * chunk_size:(cy + 1) * chunk_size, cx * chunk_size:(cx + 1) * chunk_size]
+                if block.any():
+                    write_atomic(os.path.join(directory, f'{cx}_{cy}.npy'), lambda f: np.save(f, block))
+        # Written last, so an interrupted build is seen as stale and redone
+        write_atomic(os.path.join(directory, 'meta.npz'), lambda f: np.savez(
+            f, chunk_size=np.array(chunk_size), size=np.array(layers.shape[1:]), **_level_arrays(source, level)))
+        return True
+    except OSError:
+        return False
+
+
+def load_chunk_meta(directory, expected_hash, chunk_size):
+    # Everything about a chunked level except its tiles, or None when missing or stale
+    try:
+        with np.load(os.path.join(directory, 'meta.npz'), allow_pickle=False) as data:
+            if str(data['source_hash']) != expected_hash or int(data['chunk_size']) != chunk_size:
+                return None
+            level = _level_data(data)
+            level['size'] = tuple(data['size'].tolist())
+            return level
+    except CACHE_ERRORS:
+        return None
+
+
+def load_chunk(directory, cx, cy):
+    # Tile planes of one chunk as saved, or None for an empty chunk. Edge chunks may be smaller than chunk_size.
+    path = os.path.join(directory, f'{cx}_{cy}.npy')
+    if not os.path.exists(path):
+        return None
+    try:
+        return np.load(path, allow_pickle=False)
+    except CACHE_ERRORS:
+        # Damaged after the build finished. Drop the meta file so the next load of the level rebuilds every chunk,
+        # until then this chunk plays empty rather than crashing the game
+        try:
+            os.remove(os.path.join(directory, 'meta.npz'))
+        except OSError:
+            pass
+        return None
@@ -0,0 +1,141 @@
+import pygame
+
+PAUSE_DIM_ALPHA = 160  # How strongly the frozen game frame is greyed out behind the pause menu
+REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED)
+
+LEVEL_BUTTONS = [
+    ("Level 1", 1),
+    ("Level 2", 2),
+    ("Level 3", 3)
+]
+
+
+# Start, level select and pause screens, each drawn once into a full screen surface and cached by what it shows.
+# present() only touches the window when the screen to show changed or the window needs repainting.
+class Menus:
+    def __init__(self, game):
+        self.game = game
+        self.title_font = pygame.font.SysFont(None, 74)
+        self.option_font = pygame.font.SysFont(None, 48)
+        self.surfaces = {}  # Screen key -> surface
+        self.shown = None  # Key of the screen on the window, None after the game drew over it
+        self.pause_surface = None  # Built from a snapshot of the game when the pause starts
+        self.resume_rect = None
+        self.main_menu_rect = None
+
+    def present(self, key, draw, events=(), cache=True):
+        """
+        Put a menu screen on the window if it isn't there already.
+
+        :param key: Everything the screen shows, used as its cache key.
+        :param draw: Called with a new screen sized surface to draw the screen onto when it isn't cached.
+        :param events: Events handled this frame. Expose and resize events force a repaint.
+        :param cache: Keep the drawn surface for next time. Off for screens that won't come back, like loading progress.
+        :return: True if the window was updated.
+        """
+        if key == self.shown and not any(event.type in REDRAW_EVENTS for event in events):
+            return False
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface(self.game.presenter.screen_size)
+            draw(surface)
+            if cache:
+                self.surfaces[key] = surface
+        self.game.presenter.present(surface)
+        self.shown = key
+        return True
+
+    def invalidate(self):
+        # The game drew over the window, so the next menu has to be put back
+        self.shown = None
+        self.pause_surface = None
+
+    def draw_start_screen(self, surf, progress=None):
+        # With progress (0 to 100) a loading bar takes the place of the prompt
+        surf.fill((0, 0, 0))
+        title_text = self.title_font.render("Ninja Platformer", True, (255, 255, 255))
+        surf.blit(title_text, (surf.get_width() // 2 - title_text.get_width() // 2, 100))
+
+        start_text = self.option_font.render("Click to Start", True, (255, 255, 255))
+        if progress is None:
+            surf.blit(start_text, (surf.get_width() // 2 - start_text.get_width() // 2, 300))
+        else:
+            bar = pygame.Rect(0, 0, 300, 20)
+            bar.center = (surf.get_width() // 2, 300 + start_text.get_height() // 2)
+            pygame.draw.rect(surf, (255, 255, 255), bar, 2)
+            pygame.draw.rect(surf, (255, 255, 255), (bar.x + 4, bar.y + 4, (bar.width - 8) * progress // 100, bar.height - 8))
+
+    def level_unlocked(self, level_num):
+        return level_num == 1 or self.game.levels[f'level{level_num-1}']['completed']
+
+    def level_select_key(self):
+        return ('level_select',) + tuple(self.game.levels[f'level{level_num}']['completed'] for _, level_num in LEVEL_BUTTONS)
+
+    def draw_level_selector(self, surf):
+        surf.fill((0, 0, 0))
+        title_text = self.option_font.render("Select Level", True, (255, 255, 255))
+        surf.blit(title_text, (surf.get_width() // 2 - title_text.get_width() // 2, 50))
+
+        for idx, (level_name, level_num) in enumerate(LEVEL_BUTTONS):
+            color = (255, 255, 255) if self.level_unlocked(level_num) else (100, 100, 100)
+
+            level_text = self.option_font.render(level_name, True, color)
+            rect = level_text.get_rect(center=(surf.get_width() // 2, 150 + idx * 100))
+            surf.blit(level_text, rect)
+
+            # Draw the green checkmark if the level is completed
+            if self.game.levels[f'level{level_num}']['completed']:
+                checkmark_pos = (rect.right + 20, rect.centery - 5)  # Position the checkmark to the right of the level text
+                surf.blit(self.game.assets['checkmark'], checkmark_pos)
+
+    def level_at(self, pos):
+        # Number of the unlocked level whose button is at pos, or None
+        for idx, (level_name, level_num) in enumerate(LEVEL_BUTTONS):
+            if self.level_unlocked(level_num):
+                rect = pygame.Rect(self.game.presenter.screen_size[0] // 2 - 100, 150 + idx * 100 - 20, 200, 40)
+                if rect.collidepoint(pos):
+                    return level_num
+        return None
+
+    def draw_pause_menu(self, surf):
+        # Dim the frozen game frame once instead of re-blending it every frame
+        pygame.transform.scale(self.game.display, surf.get_size(), surf)
+        overlay = pygame.Surface(surf.get_size())
+        overlay.fill((150, 150, 150))
+        overlay.set_alpha(PAUSE_DIM_ALPHA)
+        surf.blit(overlay, (0, 0))
+
+        # Calculate the position and size of the pause menu
+        menu_width = surf.get_width() // 2
+        menu_height = surf.get_height() // 2
+        menu_x = (surf.get_width() - menu_width) // 2
+        menu_y = (surf.get_height() - menu_height) // 2
+
+        # Draw the white menu background with a black border
+        menu_rect = pygame.Rect(menu_x, menu_y, menu_width, menu_height)
+        pygame.draw.rect(surf, (255, 255, 255), menu_rect)  # White background
+        pygame.draw.rect(surf, (0, 0, 0), menu_rect, 5)  # Black border with thickness 5
+
+        # Render the "Paused" text
+        pause_text = self.title_font.render("Paused", True, (0, 0, 0))
+        surf.blit(pause_text, pause_text.get_rect(center=(menu_rect.centerx, menu_rect.y + 50)))
+
+        # Draw the "Resume" and "Return to Menu" options
+        resume_text = self.option_font.render("Resume", True, (0, 0, 0))
+        menu_text = self.option_font.render("Main Menu", True, (0, 0, 0))
+        self.resume_rect = resume_text.get_rect(center=(menu_rect.centerx, menu_rect.centery))
+        self.main_menu_rect = menu_text.get_rect(center=(menu_rect.centerx, menu_rect.centery + 60))
+        surf.blit(resume_text, self.resume_rect)
+        surf.blit(menu_text, self.main_menu_rect)
+
+    def present_pause_menu(self, events=()):
+        # Not kept in surfaces: it shows whatever the game looked like when it was paused
+        if self.pause_surface is None:
+            self.pause_surface = pygame.Surface(self.game.presenter.screen_size)
+            self.draw_pause_menu(self.pause_surface)
+            self.shown = None
+        if self.shown == 'pause' and not any(event.type in REDRAW_EVENTS for event in events):
+            return False
+        self.game.presenter.present(self.pause_surface)
+        self.shown = 'pause'
+        return True
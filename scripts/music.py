@@ -0,0 +1,60 @@
+import pygame
+
+MUSIC_VOLUME = 0.15
+MUSIC_FADE_MS = 500  # Fade out of the old track and fade in of the new one when tracks change
+
+
+# Background music streamed from disk through pygame.mixer.music, so a track is never decoded into memory whole.
+# There is only one music stream, so changing tracks fades the old one out first and then fades the new one in.
+class Music:
+    def __init__(self, silent=False, volume=MUSIC_VOLUME, fade_ms=MUSIC_FADE_MS):
+        """
+        :param silent: Do nothing, for headless runs without an audio device.
+        :param volume: Music volume from 0 to 1.
+        :param fade_ms: Length of the fades when starting, stopping and changing tracks.
+        """
+        self.silent = silent
+        self.volume = volume
+        self.fade_ms = fade_ms
+        self.track = None  # Track playing or paused, None when stopped or fading out
+        self.paused = False
+        self.next_track = None  # Waiting for the last track to fade out
+
+    def play(self, track):
+        # Loop a track. Resumes it when paused and carries on when it is already playing, so this can be called every frame
+        if self.silent:
+            return
+        if track == self.track:
+            if self.paused:
+                pygame.mixer.music.unpause()
+                self.paused = False
+            return
+        self.stop()
+        self.next_track = track
+        self.update()
+
+    def stop(self):
+        if self.silent:
+            return
+        self.next_track = None
+        if self.track is None:
+            return
+        if self.paused:
+            pygame.mixer.music.stop()  # A paused stream can't fade
+        else:
+            pygame.mixer.music.fadeout(self.fade_ms)
+        self.track = None
+        self.paused = False
+
+    def pause(self):
+        if self.track is not None and not self.paused:
+            pygame.mixer.music.pause()
+            self.paused = True
+
+    def update(self):
+        # Start the next track once the last one has faded out
+        if self.next_track is not None and not pygame.mixer.music.get_busy():
+            pygame.mixer.music.load(self.next_track)
+            pygame.mixer.music.set_volume(self.volume)
+            pygame.mixer.music.play(-1, fade_ms=self.fade_ms)
+            self.track, self.next_track = self.next_track, None
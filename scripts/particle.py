@@ -1,50 +1,131 @@
-import pygame
+import math
+import numpy as np
 
-class Particle:
-    def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0):
+PARTICLE_CAPACITY = 1024  # Initial slots, doubled whenever they run out
+
+
+# All particles of a level in flat NumPy arrays: position, velocity, per-tick drift, age and kind.
+# Each kind precomputes the image and draw offset for every age, so update and render are array ops
+# plus one Surface.blits call. Dead particles are swap-removed, so draw order is not spawn order.
+class ParticleSystem:
+    def __init__(self, game, capacity=PARTICLE_CAPACITY):
         self.game = game
-        self.type = p_type
-        self.pos = list(pos)
-        self.velocity = list(velocity)
-        self.animation = self.game.assets['particle/' + p_type].copy()
-        self.animation_frame = frame
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.drift = np.zeros(capacity)  # Added to both x and y every tick
+        self.age = np.zeros(capacity, dtype=np.int32)  # Ticks lived
+        self.kind = np.zeros(capacity, dtype=np.int32)
 
-    def update(self):
-        kill = False
-        if self.animation.done:
-            kill = True
+        self.kind_ids = {}
+        self.kind_sway = []
+        self.images = []
+        self.image_rows = []  # Per kind: image index for every age
+        self.offset_rows = []  # Per kind: draw offset from the position for every age
+        self.lifetimes = np.zeros(0, dtype=np.int32)
+        self.image_table = np.zeros((0, 1), dtype=np.int32)
+        self.offset_table = np.zeros((0, 1, 2))
+        self.max_image_size = 0
 
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
+        # Falling leaf: plays its animation once, drifting by a sway picked from its spawn frame
+        leaf = game.assets['particle/leaf']
+        self.add_kind('leaf', leaf.images, img_dur=leaf.img_duration, sway=True)
+        # Skull over a killed enemy: floats up and fades out over 3 seconds
+        self.add_kind('skull', [game.assets['skull']], lifetime=120, fade=180, centered=False)
 
-        self.animation.update()
+    def __len__(self):
+        return self.count
 
-        return kill
+    def add_kind(self, name, images, img_dur=None, lifetime=None, fade=None, centered=True, sway=False):
+        """
+        Register a particle kind.
 
-    def render(self, surf, offset=(0, 0)):
-        img = self.animation.img()
-        surf.blit(img, (self.pos[0] - offset[0] - img.get_width() // 2, self.pos[1] - offset[1] - img.get_height() // 2))
+        :param name: Name to emit it by.
+        :param images: Animation frames, or a single image in a list.
+        :param img_dur: Ticks per frame. None keeps the first frame for the whole lifetime.
+        :param lifetime: Ticks until the particle is removed, by default once through the animation.
+        :param fade: Ticks over which alpha would go from 255 to 0, counted down from the lifetime. None for no fade.
+        :param centered: Draw the image centred on the position instead of from its top left.
+        :param sway: Drift sideways and down by a constant picked from the spawn frame.
+        """
+        if lifetime is None:
+            lifetime = len(images) * img_dur
+        image_row, offset_row = [], []
+        for age in range(lifetime + 1):
+            img = images[min(age, len(images) * img_dur - 1) // img_dur] if img_dur else images[0]
+            if fade:
+                img = self.game.transforms.get(img, alpha=max(0, int(255 * ((lifetime - age) / fade))), pin=True)
+            if img not in self.images:
+                self.images.append(img)
+            image_row.append(self.images.index(img))
+            offset_row.append((img.get_width() // 2, img.get_height() // 2) if centered else (0, 0))
+            self.max_image_size = max(self.max_image_size, img.get_width(), img.get_height())
 
+        self.kind_ids[name] = len(self.kind_sway)
+        self.kind_sway.append(sway)
+        self.image_rows.append(image_row)
+        self.offset_rows.append(offset_row)
+        self.lifetimes = np.append(self.lifetimes, lifetime).astype(np.int32)
 
-class SkullParticle:
-    def __init__(self, game, pos):
-        self.game = game
-        self.pos = pygame.Vector2(pos)
-        self.velocity = pygame.Vector2(0, -0.3)
-        self.lifetime = 120  # 3 seconds at 60 FPS
-        self.image = game.assets['skull']
-        self.alpha = 255
+        # Pad every kind's rows to the longest lifetime so they index as one table
+        width = max(len(row) for row in self.image_rows)
+        self.image_table = np.array([row + [row[-1]] * (width - len(row)) for row in self.image_rows], dtype=np.int32)
+        self.offset_table = np.array([row + [row[-1]] * (width - len(row)) for row in self.offset_rows], dtype=np.float64)
+
+    def grow(self):
+        capacity = len(self.age) * 2
+        for name in ('pos', 'velocity', 'drift', 'age', 'kind'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def emit(self, kind, pos, velocity=(0, 0), frame=0):
+        if self.count == len(self.age):
+            self.grow()
+        i = self.count
+        kind_id = self.kind_ids[kind]
+        self.pos[i] = pos
+        self.velocity[i] = velocity
+        self.drift[i] = math.sin(frame * 0.035) * 0.3 if self.kind_sway[kind_id] else 0.0
+        self.age[i] = 0
+        self.kind[i] = kind_id
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
 
     def update(self):
-        self.pos += self.velocity
-        self.lifetime -= 1
-        self.alpha = max(0, int(255 * (self.lifetime / 180)))
-        if self.lifetime <= 0:
-            return True
-        return False
+        n = self.count
+        if not n:
+            return
+        self.pos[:n] += self.velocity[:n]
+        self.pos[:n] += self.drift[:n, None]
+        self.age[:n] += 1
+        dead = self.age[:n] >= self.lifetimes[self.kind[:n]]
+        if dead.any():
+            self.remove(dead)
+
+    def remove(self, dead):
+        # Fill the holes below the new count with the survivors above it
+        n = self.count
+        alive_count = n - int(dead.sum())
+        holes = np.flatnonzero(dead[:alive_count])
+        movers = np.flatnonzero(~dead[alive_count:]) + alive_count
+        for array in (self.pos, self.velocity, self.drift, self.age, self.kind):
+            array[holes] = array[movers]
+        self.count = alive_count
 
     def render(self, surf, offset=(0, 0)):
-        img = self.image.copy()
-        img.set_alpha(self.alpha)
-        surf.blit(img, (self.pos.x - offset[0], self.pos.y - offset[1]))
+        n = self.count
+        if not n:
+            return
+        kinds, ages = self.kind[:n], self.age[:n]
+        pos = self.pos[:n] - offset - self.offset_table[kinds, ages]
 
+        # Skip everything outside the surface
+        width, height = surf.get_size()
+        visible = (pos[:, 0] > -self.max_image_size) & (pos[:, 0] < width) & (pos[:, 1] > -self.max_image_size) & (pos[:, 1] < height)
+        images = self.images
+        surf.blits([(images[i], p) for i, p in zip(self.image_table[kinds[visible], ages[visible]].tolist(), pos[visible].tolist())],
+                   doreturn=False)
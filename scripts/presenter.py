@@ -0,0 +1,130 @@
+import pygame
+
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+except ImportError:  # Not in every pygame build, e.g. the web one
+    Window = Renderer = Texture = None
+
+SCREEN_SIZE = (640, 480)  # Size menus are laid out at, and the window size to start with
+BACKGROUND_COLOR = (0, 0, 0)  # Bars around the picture when the window's shape doesn't match
+
+
+def fit_rect(size, window_size, integer=True):
+    """
+    Where a surface goes in the window: as large as fits, centred and keeping its shape.
+
+    :param size: Size of the surface to show.
+    :param window_size: Size of the window.
+    :param integer: Only scale by whole numbers, so every pixel stays the same size. Used whenever it scales up at all.
+    :return: Rect in window pixels.
+    """
+    scale = min(window_size[0] / size[0], window_size[1] / size[1])
+    if integer and scale >= 1:
+        scale = int(scale)
+    rect = pygame.Rect(0, 0, max(1, int(size[0] * scale)), max(1, int(size[1] * scale)))
+    rect.center = (window_size[0] // 2, window_size[1] // 2)
+    return rect
+
+
+# Puts finished frames on the window, scaled up to the window's size. The window may be resized or fullscreen,
+# the picture stays centred with bars around it. Two backends:
+#   surface:  scales straight into the window surface on the CPU, without allocating a new surface per frame.
+#   renderer: uploads the frame to a texture and lets an SDL renderer (GPU or SDL's own software one) scale it.
+#             pygame.Surface.convert() needs a display mode, so a hidden 1x1 one is kept next to the renderer's window.
+class Presenter:
+    def __init__(self, title, screen_size=SCREEN_SIZE, renderer=False, fullscreen=False, integer=True):
+        """
+        :param title: Window title.
+        :param screen_size: Window size to open with, and the size menus are drawn at.
+        :param renderer: Present through pygame._sdl2 when this pygame has it.
+        :param fullscreen: Start fullscreen.
+        :param integer: Scale by whole numbers only, as long as the frame fits the window.
+        """
+        self.screen_size = screen_size
+        self.window_size = screen_size  # Size to go back to when leaving fullscreen
+        self.integer = integer
+        self.fullscreen = False
+        self.layouts = {}  # Frame size -> (rect in the window, scale target, window surface, window size)
+        self.textures = {}  # Frame size -> streaming texture, renderer backend only
+        self.window = None
+        self.renderer = None
+
+        if renderer and Renderer is not None:
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+            self.window = Window(title, screen_size, resizable=True)
+            self.renderer = Renderer(self.window, accelerated=-1)
+            self.renderer.draw_color = (*BACKGROUND_COLOR, 255)
+        else:
+            pygame.display.set_caption(title)
+            pygame.display.set_mode(screen_size, pygame.RESIZABLE)
+        if fullscreen:
+            self.toggle_fullscreen()
+
+    @property
+    def backend(self):
+        return 'renderer' if self.renderer else 'surface'
+
+    def size(self):
+        return self.window.size if self.renderer else pygame.display.get_surface().get_size()
+
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+        if self.renderer:
+            if self.fullscreen:
+                self.window.set_fullscreen(desktop=True)
+            else:
+                self.window.set_windowed()
+        elif self.fullscreen:
+            self.window_size = self.size()
+            pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            pygame.display.set_mode(self.window_size, pygame.RESIZABLE)
+        self.layouts.clear()
+
+    def to_screen(self, pos):
+        # Window coordinates, like a mouse event's, to coordinates on a screen_size surface
+        rect = fit_rect(self.screen_size, self.size(), self.integer)
+        return ((pos[0] - rect.x) * self.screen_size[0] // rect.width,
+                (pos[1] - rect.y) * self.screen_size[1] // rect.height)
+
+    def present(self, surf):
+        # Show surf on the window, scaled to fit
+        if self.renderer:
+            self.present_texture(surf)
+        else:
+            self.present_surface(surf)
+
+    def present_surface(self, surf):
+        window = pygame.display.get_surface()
+        layout = self.layouts.get(surf.get_size())
+        if layout is None or layout[2] is not window or layout[3] != window.get_size():
+            # Window opened, resized or its surface replaced. Paint the bars once, frames only touch the rect after
+            rect = fit_rect(surf.get_size(), window.get_size(), self.integer)
+            if window.get_bitsize() == surf.get_bitsize() and window.get_masks() == surf.get_masks():
+                target = window.subsurface(rect)
+            else:
+                target = pygame.Surface(rect.size, 0, surf)  # Scaling needs surf's format, then one blit converts it
+            self.layouts[surf.get_size()] = layout = (rect, target, window, window.get_size())
+            window.fill(BACKGROUND_COLOR)
+            dirty = window.get_rect()
+        else:
+            dirty = layout[0]
+
+        rect, target = layout[:2]
+        if rect.size == surf.get_size():
+            window.blit(surf, rect)
+        else:
+            pygame.transform.scale(surf, rect.size, target)
+            if target.get_parent() is not window:
+                window.blit(target, rect)
+        pygame.display.update(dirty)
+
+    def present_texture(self, surf):
+        texture = self.textures.get(surf.get_size())
+        if texture is None:
+            texture = Texture(self.renderer, surf.get_size(), streaming=True)
+            self.textures[surf.get_size()] = texture
+        texture.update(surf)
+        self.renderer.clear()
+        texture.draw(dstrect=fit_rect(surf.get_size(), self.window.size, self.integer))
+        self.renderer.present()
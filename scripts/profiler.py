@@ -0,0 +1,156 @@
+import json
+import time
+from collections import deque
+import pygame
+
+PROFILE_FRAMES = 600  # Frames kept in the ring buffer, 10 seconds at 60 FPS
+OVERLAY_FRAMES = 60  # Frames the overlay averages over
+OVERLAY_REFRESH = 15  # Frames between overlay redraws
+
+
+# Returned by a disabled profiler, so a `with` around a stage costs next to nothing
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler.depth -= 1
+        self.profiler.current.append((self.name, self.start, end - self.start, self.profiler.depth))
+        return False
+
+
+# Per-frame span timer. Every finished frame is kept in a ring buffer as (start, duration, spans),
+# each span being (name, start, duration, depth) with times in seconds from time.perf_counter().
+class Profiler:
+    def __init__(self, enabled=False, capacity=PROFILE_FRAMES):
+        self.enabled = enabled
+        self.frames = deque(maxlen=capacity)
+        self.current = []
+        self.depth = 0
+        self.frame_start = None
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def begin_frame(self):
+        # A new span list every frame, so spans from a frame the profiler was turned on in are never stored.
+        # end_frame only keeps frames that began enabled
+        self.current = []
+        self.frame_start = time.perf_counter() if self.enabled else None
+
+    def end_frame(self):
+        if self.enabled and self.frame_start is not None:
+            self.frames.append((self.frame_start, time.perf_counter() - self.frame_start, self.current))
+            self.frame_start = None
+
+    def last_frame(self):
+        # Milliseconds per span name in the newest frame
+        if not self.frames:
+            return {}
+        times = {}
+        for name, start, duration, depth in self.frames[-1][2]:
+            times[name] = times.get(name, 0.0) + duration * 1000
+        return times
+
+    def stage_times(self, frames=OVERLAY_FRAMES):
+        """
+        Average time of every span over recent frames.
+
+        :param frames: How many of the newest frames to average over.
+        :return: List of (name, depth, ms) in the order the spans started in the newest frame.
+        """
+        recent = list(self.frames)[-frames:]
+        if not recent:
+            return []
+        totals = {}
+        for frame in recent:
+            for name, start, duration, depth in frame[2]:
+                totals[name] = totals.get(name, 0.0) + duration
+        order = sorted(recent[-1][2], key=lambda span: span[1])
+        return [(name, depth, totals[name] * 1000 / len(recent)) for name, start, duration, depth in order if name in totals]
+
+    def frame_ms(self, frames=OVERLAY_FRAMES):
+        recent = list(self.frames)[-frames:]
+        return sum(frame[1] for frame in recent) * 1000 / len(recent) if recent else 0.0
+
+    def fps(self, frames=OVERLAY_FRAMES):
+        # Measured from frame start to frame start, so it includes waiting on the clock
+        recent = list(self.frames)[-frames:]
+        if len(recent) < 2 or recent[-1][0] == recent[0][0]:
+            return 0.0
+        return (len(recent) - 1) / (recent[-1][0] - recent[0][0])
+
+    def export_chrome_trace(self, path):
+        """
+        Write the ring buffer as Chrome trace-event JSON, for chrome://tracing or https://ui.perfetto.dev.
+
+        :param path: File to write.
+        """
+        events = []
+        origin = self.frames[0][0] if self.frames else 0.0
+        for index, (frame_start, frame_duration, spans) in enumerate(self.frames):
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0, 'args': {'frame': index},
+                           'ts': (frame_start - origin) * 1e6, 'dur': frame_duration * 1e6})
+            for name, start, duration, depth in spans:
+                events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                               'ts': (start - origin) * 1e6, 'dur': duration * 1e6})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+# Debug overlay with FPS, entity counts and the time of every profiled stage
+class ProfilerOverlay:
+    def __init__(self, game):
+        self.game = game
+        self.font = None
+        self.surface = None
+        self.age = OVERLAY_REFRESH
+
+    def lines(self):
+        profiler = self.game.profiler
+        lines = [f'FPS {profiler.fps():.1f}  frame {profiler.frame_ms():.2f} ms',
+                 f'enemies {len(self.game.enemies)}  particles {len(self.game.particles)}  projectiles {len(self.game.projectiles)}']
+        for name, depth, ms in profiler.stage_times():
+            lines.append(f"{'  ' * depth}{name} {ms:.2f}")
+        return lines
+
+    def redraw(self):
+        if self.font is None:
+            self.font = pygame.font.SysFont(None, 14)
+        texts = [self.font.render(line, True, (255, 255, 255)) for line in self.lines()]
+        self.surface = pygame.Surface((max(text.get_width() for text in texts) + 4, sum(text.get_height() for text in texts) + 4))
+        self.surface.set_alpha(200)
+        y = 2
+        for text in texts:
+            self.surface.blit(text, (2, y))
+            y += text.get_height()
+
+    def render(self, surf):
+        # Text is only redrawn every few frames so the overlay doesn't skew what it measures
+        self.age += 1
+        if self.age >= OVERLAY_REFRESH or self.surface is None:
+            self.redraw()
+            self.age = 0
+        surf.blit(self.surface, (0, surf.get_height() - self.surface.get_height()))
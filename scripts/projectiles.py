@@ -1,75 +1,178 @@
+import numpy as np
 import pygame
 
-class Projectile:
-    def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0, size=None):
+PROJECTILE_CAPACITY = 256  # Initial pool slots, doubled whenever they run out
+PROJECTILE_LIFETIME = 600  # Ticks a projectile may fly before it is dropped, 10 seconds at 60 FPS
+TARGET_ENEMIES = 0
+TARGET_PLAYER = 1
+
+
+# Pool of every live projectile in flat NumPy arrays. Movement, the lifetime cap and tile collision are
+# array ops. Hits on the player are one vectorized rect test. Hits on enemies go through the game's
+# spatial hash, one projectile at a time. Dead slots are compacted in order, so hits still resolve
+# in the order projectiles were fired.
+class ProjectileSystem:
+    def __init__(self, game, capacity=PROJECTILE_CAPACITY):
         self.game = game
-        self.type = p_type
-        self.pos = list(pos)
-        self.velocity = list(velocity)
-        self.animation = self.game.assets['projectiles/' + p_type].copy()
-        self.animation_frame = frame
-        
-        img = self.animation.img()
-        self.size = size if size else (img.get_width(), img.get_height())
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2))  # Position at the previous tick, for render interpolation
+        self.velocity = np.zeros((capacity, 2))
+        self.knockback = np.zeros((capacity, 2))
+        self.age = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int32)
+        self.flipped = np.zeros(capacity, dtype=np.int32)  # Spins the other way when thrown to the left
+
+        self.kind_ids = {}
+        self.images = []
+        self.image_rows = []  # Per kind: [forward, reversed] image indexes for every animation tick
+        self.sizes = np.zeros((0, 2), dtype=np.int64)
+        self.damages = np.zeros(0, dtype=np.int32)
+        self.targets = np.zeros(0, dtype=np.int32)
+        self.lifetimes = np.zeros(0, dtype=np.int32)
+        self.periods = np.zeros(0, dtype=np.int32)
+        self.image_table = np.zeros((0, 2, 1), dtype=np.int32)
+        self.half_image = np.zeros((0, 2))
+        self.max_image_size = 0
+
+        # Thrown by the player, hurts enemies
+        self.add_kind('shuriken', game.assets['projectiles/shuriken'], target=TARGET_ENEMIES)
+        # Fired by bosses, hurts the player
+        self.add_kind('red_shuriken', game.assets['projectiles/red_shuriken'], target=TARGET_PLAYER)
+
+    def __len__(self):
+        return self.count
+
+    def add_kind(self, name, animation, size=(12, 12), damage=10, target=TARGET_ENEMIES, lifetime=PROJECTILE_LIFETIME):
+        """
+        Register a projectile kind.
+
+        :param name: Name to emit it by.
+        :param animation: Looping Animation it spins through.
+        :param size: Hitbox width and height, centred on the position.
+        :param damage: Health taken from whatever it hits.
+        :param target: TARGET_ENEMIES or TARGET_PLAYER.
+        :param lifetime: Ticks until it is dropped if it hasn't hit anything.
+        """
+        period = len(animation.images) * animation.img_duration
+        rows = []
+        for images in (animation.images, animation.images[::-1]):
+            row = []
+            for tick in range(period):
+                img = images[tick // animation.img_duration]
+                if img not in self.images:
+                    self.images.append(img)
+                    self.max_image_size = max(self.max_image_size, img.get_width(), img.get_height())
+                row.append(self.images.index(img))
+            rows.append(row)
+
+        self.kind_ids[name] = len(self.image_rows)
+        self.image_rows.append(rows)
+        self.sizes = np.vstack([self.sizes, size])
+        self.damages = np.append(self.damages, damage).astype(np.int32)
+        self.targets = np.append(self.targets, target).astype(np.int32)
+        self.lifetimes = np.append(self.lifetimes, lifetime).astype(np.int32)
+        self.periods = np.append(self.periods, period).astype(np.int32)
+        self.half_image = np.vstack([self.half_image, [animation.images[0].get_width() // 2, animation.images[0].get_height() // 2]])
+
+        # Pad every kind's rows to the longest animation so they index as one table
+        width = max(self.periods.tolist())
+        self.image_table = np.array([[row + [row[-1]] * (width - len(row)) for row in rows] for rows in self.image_rows], dtype=np.int32)
+
+    def grow(self):
+        capacity = len(self.age) * 2
+        for name in ('pos', 'prev_pos', 'velocity', 'knockback', 'age', 'kind', 'flipped'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def emit(self, kind, pos, velocity):
+        if self.count == len(self.age):
+            self.grow()
+        i = self.count
+        self.pos[i] = pos
+        self.prev_pos[i] = pos
+        self.velocity[i] = velocity
+        self.knockback[i] = (5 if velocity[0] > 0 else -5, -2)  # Pushes whatever it hits along its path and up
+        self.age[i] = 0
+        self.kind[i] = self.kind_ids[kind]
+        self.flipped[i] = velocity[0] < 0
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def remember_positions(self):
+        self.prev_pos[:self.count] = self.pos[:self.count]
+
+    def hitboxes(self):
+        # Integer hitbox corners as pygame.Rect would truncate them
+        n = self.count
+        sizes = self.sizes[self.kind[:n]]
+        left = np.trunc(self.pos[:n, 0] - sizes[:, 0] // 2).astype(np.int64)
+        top = np.trunc(self.pos[:n, 1] - sizes[:, 1] // 2).astype(np.int64)
+        return left, top, sizes
 
     def update(self):
-        kill = False
-        if self.animation.done:
-            kill = True
-        if self.check_collision():
-            kill = True
-
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-
-        self.animation.update()
-
-        return kill
-
-    def check_collision(self):
-        for enemy in self.game.enemies:
-            if enemy.rect().colliderect(self.rect()):
-                enemy.apply_knockback(self.knockback)
-                enemy.take_damage(10)  # Deal 10 damage to the enemy
-                return True
-        return False
-            
-    def rect(self):
-        return pygame.Rect(
-            self.pos[0] - self.size[0] // 2,
-            self.pos[1] - self.size[1] // 2,
-            self.size[0],
-            self.size[1]
-        )
-
-    def render(self, surf, offset=(0, 0)):
-        img = self.animation.img()
-        # Draw the projectile image
-        surf.blit(img, (self.pos[0] - offset[0] - img.get_width() // 2, self.pos[1] - offset[1] - img.get_height() // 2))
-        # Draw the hitbox rectangle
-        # hitbox = self.rect().move(-offset[0], -offset[1])
-        # pygame.draw.rect(surf, (0, 255, 0), hitbox, 1)
-
-class Shuriken(Projectile):
-    def __init__(self, game, pos, velocity=[0, 0], frame=0, size=(12,12)):
-        super().__init__(game, 'shuriken', pos, velocity=velocity, frame=frame, size=size)
-        self.knockback = pygame.Vector2(5, -2) if velocity[0] > 0 else pygame.Vector2(-5, -2)
-        self.animation.images = self.animation.images[:]
-        if self.velocity[0] < 0:
-            self.animation.images.reverse()
-
-class RedShuriken(Projectile):
-    def __init__(self, game, pos, velocity=[0, 0], frame=0, size=(12,12)):
-        super().__init__(game, 'red_shuriken', pos, velocity=velocity, frame=frame, size=size)
-        # Use the velocity to set the knockback vector
-        knockback_x = pygame.Vector2(velocity[0], 0).normalize().x * 5  # X component based on velocity
-        self.knockback = pygame.Vector2(knockback_x, -2)  # Consistent -2 for Y component
-        self.animation.images = self.animation.images[:]
-        if self.velocity[0] < 0:
-            self.animation.images.reverse()
-
-    def check_collision(self):
-        if self.game.player.rect().colliderect(self.rect()):
-            self.game.player.take_damage(10, self.knockback)  # Deal 10 damage to the player
-            return True
-        return False
\ No newline at end of file
+        n = self.count
+        if not n:
+            return
+        kinds = self.kind[:n]
+        targets = self.targets[kinds]
+        damages = self.damages[kinds].tolist()
+        kill = np.zeros(n, dtype=bool)
+
+        # Hits are checked where the projectile is before it moves
+        left, top, sizes = self.hitboxes()
+        for i in np.flatnonzero(targets == TARGET_ENEMIES).tolist():
+            rect = pygame.Rect(int(left[i]), int(top[i]), int(sizes[i, 0]), int(sizes[i, 1]))
+            for enemy in self.game.spatial_hash.query(rect):
+                if enemy.rect().colliderect(rect):
+                    enemy.apply_knockback(pygame.Vector2(self.knockback[i].tolist()))
+                    enemy.take_damage(damages[i])
+                    kill[i] = True
+                    break
+
+        player = self.game.player.rect()
+        hits = ((targets == TARGET_PLAYER) & (left < player.right) & (left + sizes[:, 0] > player.left)
+                & (top < player.bottom) & (top + sizes[:, 1] > player.top))
+        for i in np.flatnonzero(hits).tolist():
+            self.game.player.take_damage(damages[i], pygame.Vector2(self.knockback[i].tolist()))
+        kill |= hits
+
+        self.pos[:n] += self.velocity[:n]
+        self.age[:n] += 1
+
+        # Walls and the lifetime cap
+        tile_size = self.game.tilemap.tile_size
+        cells = np.floor(self.pos[:n] / tile_size).astype(np.int64)
+        kill |= self.game.tilemap.solid_cells(cells[:, 0], cells[:, 1])
+        kill |= self.age[:n] >= self.lifetimes[kinds]
+
+        if kill.any():
+            self.remove(kill)
+
+    def remove(self, dead):
+        alive = ~dead
+        n = self.count
+        self.count = int(alive.sum())
+        for array in (self.pos, self.prev_pos, self.velocity, self.knockback, self.age, self.kind, self.flipped):
+            array[:self.count] = array[:n][alive]
+
+    def render(self, surf, offset=(0, 0), alpha=1.0):
+        n = self.count
+        if not n:
+            return
+        kinds = self.kind[:n]
+        pos = self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha
+        pos = pos - offset - self.half_image[kinds]
+
+        # Skip everything outside the surface
+        width, height = surf.get_size()
+        visible = (pos[:, 0] > -self.max_image_size) & (pos[:, 0] < width) & (pos[:, 1] > -self.max_image_size) & (pos[:, 1] < height)
+        kinds = kinds[visible]
+        phases = self.age[:n][visible] % self.periods[kinds]
+        image_ids = self.image_table[kinds, self.flipped[:n][visible], phases]
+        images = self.images
+        surf.blits([(images[i], p) for i, p in zip(image_ids.tolist(), pos[visible].tolist())], doreturn=False)
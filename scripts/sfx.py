@@ -0,0 +1,98 @@
+import pygame
+
+SFX_VOICES = 8  # Mixer channels shared by all one-shot sounds
+
+
+# Sound effects on a fixed set of mixer channels. Looping sounds each get a channel of their own and are
+# driven by state: callers say every frame whether a loop should be playing, and SDL only hears about changes.
+# One-shots share a pool of voices, limited per sound by a voice cap and a cooldown. When every voice is busy a
+# new sound takes over the oldest voice playing something of lower priority, or is dropped.
+class SoundEffects:
+    def __init__(self, silent=False, voices=SFX_VOICES):
+        """
+        :param silent: Do nothing, for headless runs without an audio device.
+        :param voices: Channels for one-shot sounds.
+        """
+        self.silent = silent
+        self.sounds = {}
+        self.settings = {}  # Name -> (priority, max voices, cooldown ms)
+        self.loop_channels = {}  # Name -> its own channel, for looping sounds
+        self.looping = set()  # Loops playing right now
+        self.voices = []  # [channel, sound name, priority, start time] for every one-shot channel
+        self.last_played = {}  # Name -> time it last started, for cooldowns
+        self.dropped = 0  # Plays skipped by a cap, cooldown or a full pool
+        if not silent:
+            # The voice pool takes the first channels, loop channels are added after it
+            pygame.mixer.set_num_channels(voices)
+            self.voices = [[pygame.mixer.Channel(i), None, 0, 0] for i in range(voices)]
+
+    def add(self, name, sound, volume=1.0, loop=False, priority=0, max_voices=2, cooldown_ms=0):
+        """
+        Register a sound effect.
+
+        :param name: Name to play it by.
+        :param sound: pygame.mixer.Sound.
+        :param volume: Volume from 0 to 1.
+        :param loop: Looping sound, switched with loop() instead of play().
+        :param priority: One-shots may take over voices playing something of lower priority.
+        :param max_voices: Most voices this one-shot may play on at once.
+        :param cooldown_ms: Shortest time between two starts of this one-shot.
+        """
+        if self.silent:
+            return
+        sound.set_volume(volume)
+        self.sounds[name] = sound
+        self.settings[name] = (priority, max_voices, cooldown_ms)
+        if loop:
+            index = len(self.voices) + len(self.loop_channels)
+            pygame.mixer.set_num_channels(index + 1)
+            self.loop_channels[name] = pygame.mixer.Channel(index)
+
+    def loop(self, name, playing):
+        # Say whether a looping sound should be playing. Cheap to call every frame
+        if self.silent or (name in self.looping) == playing:
+            return
+        if playing:
+            self.loop_channels[name].play(self.sounds[name], loops=-1)
+            self.looping.add(name)
+        else:
+            self.loop_channels[name].stop()
+            self.looping.discard(name)
+
+    def stop_loops(self):
+        for name in list(self.looping):
+            self.loop(name, False)
+
+    def play(self, name):
+        """
+        Play a one-shot sound on a free voice if its cap, cooldown and priority allow.
+
+        :return: True if it started.
+        """
+        if self.silent:
+            return False
+        priority, max_voices, cooldown_ms = self.settings[name]
+        now = pygame.time.get_ticks()
+        if now - self.last_played.get(name, -cooldown_ms) < cooldown_ms:
+            self.dropped += 1
+            return False
+
+        busy, free = [], []
+        for voice in self.voices:
+            (busy if voice[0].get_busy() else free).append(voice)
+        if sum(voice[1] == name for voice in busy) >= max_voices:
+            self.dropped += 1
+            return False
+        if free:
+            voice = free[0]
+        else:
+            lower = [voice for voice in busy if voice[2] < priority]
+            if not lower:
+                self.dropped += 1
+                return False
+            voice = min(lower, key=lambda voice: voice[3])  # The oldest
+
+        voice[0].play(self.sounds[name])
+        voice[1:] = [name, priority, now]
+        self.last_played[name] = now
+        return True
@@ -0,0 +1,72 @@
+import pygame
+
+CELL_SIZE = 32  # Bucket width and height in pixels
+MOVE_MARGIN = 16  # How far an object may move between rebuilds and still be found by a query
+
+
+# Uniform grid of buckets over world space for broadphase entity queries. Rebuilt once per tick,
+# queries are widened by the move margin and return candidates in the order they were inserted,
+# so callers still do their exact rect checks against live positions in a stable order.
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE, margin=MOVE_MARGIN):
+        self.cell_size = cell_size
+        self.margin = margin
+        self.cells = {}
+        self.object_cells = {}  # Object -> bucket keys it was inserted into
+        self.order = {}  # Object -> insertion order
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.object_cells)
+
+    def clear(self):
+        self.cells.clear()
+        self.object_cells.clear()
+        self.order.clear()
+        self.counter = 0
+
+    def cell_range(self, rect):
+        rect = pygame.Rect(rect)
+        return (rect.left // self.cell_size, (rect.right - 1) // self.cell_size + 1,
+                rect.top // self.cell_size, (rect.bottom - 1) // self.cell_size + 1)
+
+    def insert(self, obj, rect):
+        start_x, end_x, start_y, end_y = self.cell_range(rect)
+        keys = [(x, y) for x in range(start_x, end_x) for y in range(start_y, end_y)]
+        for key in keys:
+            self.cells.setdefault(key, []).append(obj)
+        self.object_cells[obj] = keys
+        self.order[obj] = self.counter
+        self.counter += 1
+
+    def remove(self, obj):
+        for key in self.object_cells.pop(obj, ()):
+            bucket = self.cells[key]
+            bucket.remove(obj)
+            if not bucket:
+                del self.cells[key]
+        self.order.pop(obj, None)
+
+    def rebuild(self, objects):
+        self.clear()
+        for obj in objects:
+            self.insert(obj, obj.rect())
+
+    def query(self, rect, exclude=None):
+        """
+        Find the objects whose buckets overlap an area, widened by the move margin.
+
+        :param rect: Area to search, anything pygame.Rect accepts.
+        :param exclude: Object to leave out of the result, e.g. the one asking.
+        :return: Candidate objects in insertion order. They may not actually overlap the area.
+        """
+        start_x, end_x, start_y, end_y = self.cell_range(pygame.Rect(rect).inflate(self.margin * 2, self.margin * 2))
+        found = set()
+        for x in range(start_x, end_x):
+            for y in range(start_y, end_y):
+                found.update(self.cells.get((x, y), ()))
+        found.discard(exclude)
+        return sorted(found, key=self.order.__getitem__)
+
+    def neighbors(self, obj, radius=0):
+        return self.query(obj.rect().inflate(radius * 2, radius * 2), exclude=obj)
@@ -0,0 +1,302 @@
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import numpy as np
+from scripts.collision import CellQueries, CollisionIndex
+from scripts.level_cache import chunks_path, source_hash, save_chunks, load_chunk_meta, load_chunk
+from scripts.tilemap import Tilemap, CHUNK_SIZE, CHUNK_CACHE_BYTES
+
+STREAM_RADIUS = 1  # Chunks kept loaded past each edge of the view
+EVICT_AFTER = 120  # Frames a chunk outside the radius may go unused before it is dropped
+SYNC_LOADS_PER_FRAME = 1  # Chunk loads per update when no worker thread can be started (e.g. the web build)
+GENERATED_SOURCE = 'generated'  # Stands in for the TMX hash of levels handed over as grids
+
+
+# The tile planes, masks and collision indexes of one resident chunk
+class TileChunk:
+    def __init__(self, layers, masks, origin, tile_size):
+        self.layers = layers
+        self.origin = origin
+        self.solid, self.interactable = masks
+        self.solid_index = CollisionIndex(self.solid, tile_size, origin)
+        self.ladder_index = CollisionIndex(self.interactable, tile_size, origin)
+        self.last_used = 0
+
+
+# Collision queries over the resident chunks of a StreamingTilemap, answered by each chunk's own CollisionIndex
+class ChunkedIndex(CellQueries):
+    def __init__(self, tilemap, index_name):
+        self.tilemap = tilemap
+        self.tile_size = tilemap.tile_size
+        self.index_name = index_name
+
+    def query_cells(self, start_x, end_x, start_y, end_y):
+        chunks = self.tilemap.chunks_in(start_x, end_x, start_y, end_y)
+        if len(chunks) == 1:
+            return getattr(chunks[0], self.index_name).query_cells(start_x, end_x, start_y, end_y)
+
+        columns, rows = [], []
+        for chunk in chunks:
+            chunk_columns, chunk_rows = getattr(chunk, self.index_name).query_cells(start_x, end_x, start_y, end_y)
+            columns.extend(chunk_columns)
+            rows.extend(chunk_rows)
+        # Keep the same map order a single index would give
+        columns.sort(key=lambda rect: (rect.x, rect.y))
+        rows.sort(key=lambda rect: (rect.y, rect.x))
+        return columns, rows
+
+
+# Tilemap that keeps only the chunks around the camera in memory. Levels are split once into chunk
+# files next to the TMX, chunks near the view are read on a worker thread and far ones are evicted.
+# Tile queries (extract, tiles_of_kind, tiles_in_layer, tiles_in_rect) only see resident chunks;
+# watch revision to pick up tiles as they stream in.
+class StreamingTilemap(Tilemap):
+    def __init__(self, game, tile_size=16, chunk_size=CHUNK_SIZE, chunk_cache_bytes=CHUNK_CACHE_BYTES, stream_radius=STREAM_RADIUS):
+        super().__init__(game, tile_size, chunk_size, chunk_cache_bytes)
+        self.stream_radius = stream_radius
+        self.directory = None
+        self.temp_directory = None  # Holds the chunk files of a level loaded with load_data, removed by close()
+        self.source_layers = None  # Whole level kept in memory only when the chunk files can't be written
+        self.kind_lookup = np.zeros(1, dtype=np.uint16)
+        self.resident = {}  # (cx, cy) -> TileChunk
+        self.pending = {}  # (cx, cy) -> Future of a TileChunk
+        self.removed = {}  # (cx, cy) -> removed (layer, x, y) cells, reapplied when the chunk is read again
+        self.frame = 0
+        self.executor = None
+        self.solid_index = ChunkedIndex(self, 'solid_index')
+        self.ladder_index = ChunkedIndex(self, 'ladder_index')
+
+    def load(self, level):
+        tmx_path = f'./graphics/levels/{level}/{level}.tmx'
+        directory = chunks_path(tmx_path)
+        source = source_hash(tmx_path)
+
+        meta = load_chunk_meta(directory, source, self.chunk_size)
+        if meta is None:
+            # Build the chunk files from the whole level once
+            dense = Tilemap(self.game, self.tile_size)
+            dense.load(level)
+            meta = self.split_level(directory, source, {
+                'layers': dense.layers,
+                'layer_names': dense.layer_names,
+                'tiles': dense.tile_records(),
+                'player_position': dense.player_position,
+                'enemy_positions': dense.enemy_positions,
+                'boss_positions': dense.boss_positions,
+            })
+        self.load_meta(directory, meta)
+
+    def load_data(self, level, directory=None):
+        """
+        Stream a level handed over as grids, like Tilemap.load_data. It is split into chunk files first.
+
+        :param level: Level data as Tilemap.load_data takes it.
+        :param directory: Where to write the chunk files. A temporary directory, removed by close(), when None.
+        """
+        if directory is None:
+            if self.temp_directory:
+                self.temp_directory.cleanup()
+            self.temp_directory = tempfile.TemporaryDirectory(prefix='chunks_')
+            directory = self.temp_directory.name
+        self.load_meta(directory, self.split_level(directory, GENERATED_SOURCE, level))
+
+    def split_level(self, directory, source, level):
+        # Write the chunk files and return the level's meta. If they can't be written, keep the whole level in memory
+        self.source_layers = None
+        if save_chunks(directory, source, level, self.chunk_size):
+            meta = load_chunk_meta(directory, source, self.chunk_size)
+            if meta is not None:
+                return meta
+        self.source_layers = level['layers']
+        return dict(level, size=level['layers'].shape[1:])
+
+    def load_meta(self, directory, meta):
+        # Make a split level current. Chunks of the last one are dropped, reads still in flight are ignored
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.resident.clear()
+        self.removed.clear()
+        self.directory = directory
+
+        self.kind_lookup = np.array([0] + [self.register_tile(*record) for record in meta['tiles']], dtype=np.uint16)
+        self.layer_names = meta['layer_names']
+        self.height, self.width = meta['size']
+        self.player_position = meta['player_position']
+        self.enemy_positions = meta['enemy_positions']
+        self.boss_positions = meta['boss_positions']
+        self.build_indexes()
+        self.reset_render_state()
+
+    def update_masks(self):
+        pass  # Every chunk carries its own masks and collision indexes
+
+    def build_indexes(self):
+        super().build_indexes()
+        for chunk in self.resident.values():
+            self.index_tiles(chunk.layers, chunk.origin[0], chunk.origin[1])
+
+    def read_chunk(self, key, removed=()):
+        # Runs on the worker thread: read, remap and index one chunk without touching shared state.
+        # removed is a copy of the chunk's removed cells, the main thread keeps adding to the shared lists
+        cx, cy = key
+        origin = (cx * self.chunk_size, cy * self.chunk_size)
+        shape = (len(self.layer_names), min(self.chunk_size, self.height - origin[1]), min(self.chunk_size, self.width - origin[0]))
+        if self.source_layers is not None:
+            layers = self.source_layers[:, origin[1]:origin[1] + shape[1], origin[0]:origin[0] + shape[2]]
+        else:
+            layers = load_chunk(self.directory, cx, cy)
+        layers = self.kind_lookup[layers] if layers is not None else np.zeros(shape, dtype=np.uint16)
+        for layer_index, x, y in removed:
+            layers[layer_index, y - origin[1], x - origin[0]] = 0
+        return TileChunk(layers, self.masks(layers), origin, self.tile_size)
+
+    def add_chunk(self, key, chunk):
+        chunk.last_used = self.frame
+        self.resident[key] = chunk
+        self.index_tiles(chunk.layers, chunk.origin[0], chunk.origin[1])
+        # Baked surfaces around it may have been drawn without this chunk's tiles
+        for cx in range(key[0], key[0] + 2):
+            for cy in range(key[1], key[1] + 2):
+                self.chunks.discard((cx, cy))
+        self.revision += 1
+
+    def evict_chunk(self, key):
+        chunk = self.resident.pop(key)
+        self.index_tiles(chunk.layers, chunk.origin[0], chunk.origin[1], add=False)
+        self.chunks.discard(key)
+        self.revision += 1
+
+    def chunk_in_map(self, key):
+        return 0 <= key[0] < -(-self.width // self.chunk_size) and 0 <= key[1] < -(-self.height // self.chunk_size)
+
+    def chunks_in(self, start_x, end_x, start_y, end_y):
+        # Resident chunks covering a cell range. Anything gameplay touches outside the streamed area is read right away.
+        start_x, end_x = max(start_x, 0), min(end_x, self.width)
+        start_y, end_y = max(start_y, 0), min(end_y, self.height)
+        chunks = []
+        for cx in range(start_x // self.chunk_size, (end_x - 1) // self.chunk_size + 1):
+            for cy in range(start_y // self.chunk_size, (end_y - 1) // self.chunk_size + 1):
+                chunk = self.resident.get((cx, cy))
+                if chunk is None:
+                    chunk = self.read_chunk((cx, cy), self.removed.get((cx, cy), ()))
+                    self.add_chunk((cx, cy), chunk)
+                chunk.last_used = self.frame
+                chunks.append(chunk)
+        return chunks
+
+    def region(self, start_x, end_x, start_y, end_y):
+        region = np.zeros((len(self.layer_names), end_y - start_y, end_x - start_x), dtype=np.uint16)
+        for cx in range(start_x // self.chunk_size, (end_x - 1) // self.chunk_size + 1):
+            for cy in range(start_y // self.chunk_size, (end_y - 1) // self.chunk_size + 1):
+                chunk = self.resident.get((cx, cy))
+                if chunk is None:
+                    continue
+                x0, x1 = max(start_x, chunk.origin[0]), min(end_x, chunk.origin[0] + chunk.layers.shape[2])
+                y0, y1 = max(start_y, chunk.origin[1]), min(end_y, chunk.origin[1] + chunk.layers.shape[1])
+                region[:, y0 - start_y:y1 - start_y, x0 - start_x:x1 - start_x] = \
+                    chunk.layers[:, y0 - chunk.origin[1]:y1 - chunk.origin[1], x0 - chunk.origin[0]:x1 - chunk.origin[0]]
+        return region
+
+    def is_solid(self, x, y):
+        if not self.in_bounds(x, y):
+            return False
+        chunk = self.chunks_in(x, x + 1, y, y + 1)[0]
+        return bool(chunk.solid[y - chunk.origin[1], x - chunk.origin[0]])
+
+    def solid_cells(self, xs, ys):
+        return np.array([self.is_solid(x, y) for x, y in zip(xs.tolist(), ys.tolist())], dtype=bool)
+
+    def remove_tiles(self, positions):
+        touched = {}
+        for layer_index, x, y in positions:
+            key = (x // self.chunk_size, y // self.chunk_size)
+            chunk = self.chunks_in(x, x + 1, y, y + 1)[0]
+            tile_id = int(chunk.layers[layer_index, y - chunk.origin[1], x - chunk.origin[0]])
+            if not tile_id:
+                continue
+            chunk.layers[layer_index, y - chunk.origin[1], x - chunk.origin[0]] = 0
+            del self.kind_positions[tile_id][(layer_index, x, y)]
+            del self.layer_positions[layer_index][(x, y)]
+            self.removed.setdefault(key, []).append((layer_index, x, y))
+            future = self.pending.pop(key, None)
+            if future:
+                future.cancel()  # A read already in flight would bring the tile back
+            self.invalidate_tile(x, y)
+            touched[key] = chunk
+
+        for key, chunk in touched.items():
+            rebuilt = TileChunk(chunk.layers, self.masks(chunk.layers), chunk.origin, self.tile_size)
+            rebuilt.last_used = self.frame
+            self.resident[key] = rebuilt
+        self.revision += 1
+
+    def chunk_ready(self, cx, cy):
+        # A baked chunk also shows tiles spilling in from the chunks above and to the left
+        keys = [(cx, cy)]
+        if self.tile_overflow[0]:
+            keys.append((cx - 1, cy))
+        if self.tile_overflow[1]:
+            keys.append((cx, cy - 1))
+        if self.tile_overflow[0] and self.tile_overflow[1]:
+            keys.append((cx - 1, cy - 1))
+        return all(key in self.resident or not self.chunk_in_map(key) for key in keys)
+
+    def close(self):
+        # Stop the worker thread. Reads not started yet are cancelled, one already running finishes on its own
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = False  # Later chunks, if any, are read on the main thread
+        if self.temp_directory:
+            self.temp_directory.cleanup()
+            self.temp_directory = None
+
+    def submit(self, key):
+        # Queue a chunk read on the worker thread, starting it on first use. False when there are no threads
+        if self.executor is False:
+            return False
+        removed = tuple(self.removed.get(key, ()))
+        try:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=1)
+            self.pending[key] = self.executor.submit(self.read_chunk, key, removed)
+            return True
+        except RuntimeError:
+            self.executor = False
+            return False
+
+    def update(self, offset=(0, 0), view_size=(0, 0)):
+        self.frame += 1
+        chunk_px = self.chunk_size * self.tile_size
+        start_cx = offset[0] // chunk_px - self.stream_radius
+        end_cx = (offset[0] + view_size[0]) // chunk_px + self.stream_radius + 1
+        start_cy = offset[1] // chunk_px - self.stream_radius
+        end_cy = (offset[1] + view_size[1]) // chunk_px + self.stream_radius + 1
+        wanted = [(cx, cy) for cx in range(start_cx, end_cx) for cy in range(start_cy, end_cy) if self.chunk_in_map((cx, cy))]
+
+        # Take in chunks the worker has finished
+        for key, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[key]
+                if key not in self.resident:
+                    self.add_chunk(key, future.result())
+
+        # Request missing chunks nearest the middle of the view first
+        center = ((start_cx + end_cx) / 2, (start_cy + end_cy) / 2)
+        missing = sorted((key for key in wanted if key not in self.resident and key not in self.pending),
+                         key=lambda key: (key[0] - center[0]) ** 2 + (key[1] - center[1]) ** 2)
+        sync_loads = 0
+        for key in missing:
+            if not self.submit(key):
+                if sync_loads >= SYNC_LOADS_PER_FRAME:
+                    break
+                self.add_chunk(key, self.read_chunk(key, self.removed.get(key, ())))
+                sync_loads += 1
+
+        # Drop chunks outside the radius that nothing has needed for a while
+        wanted = set(wanted)
+        for key, chunk in list(self.resident.items()):
+            if key not in wanted and self.frame - chunk.last_used > EVICT_AFTER:
+                self.evict_chunk(key)
@@ -1,73 +1,298 @@
+from collections import OrderedDict
+import numpy as np
 import pygame
 import pytmx
+from scripts.collision import CollisionIndex
+from scripts.level_cache import compiled_path, source_hash, load_compiled, save_compiled
 
 NEIGHBORS_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
+# Defaults for tiles whose tileset properties don't say whether they are solid or a ladder
 PHYSICS_TILE_TYPES = {'grass'}
 INTRERACTABLE_TILE_TYPES = {'ladder'}
 
+CHUNK_SIZE = 16  # Chunk width and height in tiles
+CHUNK_CACHE_BYTES = 32 * 1024 * 1024  # Memory cap for baked chunk surfaces
+
+
+# LRU of pre-rendered chunk surfaces, evicting the least recently drawn chunks over a byte budget
+class ChunkCache:
+    def __init__(self, max_bytes=CHUNK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.chunks = OrderedDict()
+        self.size_bytes = 0
+
+    def get(self, key):
+        surf = self.chunks.get(key)
+        if surf is not None:
+            self.chunks.move_to_end(key)
+        return surf
+
+    def put(self, key, surf):
+        self.discard(key)
+        self.chunks[key] = surf
+        self.size_bytes += surf.get_width() * surf.get_height() * surf.get_bytesize()
+        while self.size_bytes > self.max_bytes and len(self.chunks) > 1:
+            _, evicted = self.chunks.popitem(last=False)
+            self.size_bytes -= evicted.get_width() * evicted.get_height() * evicted.get_bytesize()
+
+    def discard(self, key):
+        surf = self.chunks.pop(key, None)
+        if surf is not None:
+            self.size_bytes -= surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+    def clear(self):
+        self.chunks.clear()
+        self.size_bytes = 0
+
+
 class Tilemap:
-    def __init__(self, game, tile_size=16):
+    def __init__(self, game, tile_size=16, chunk_size=CHUNK_SIZE, chunk_cache_bytes=CHUNK_CACHE_BYTES):
         self.tile_size = tile_size
         self.game = game
-        self.tilemap = {}
         self.offgrid_tiles = []
         self.player_position = (0, 0)
         self.enemy_positions = []
         self.boss_positions = []
         self.trees = []
-        self.boss_counter = 0
+
+        # Dense grid store: one plane of tile ids per TMX layer, id 0 is an empty cell
+        self.width = 0
+        self.height = 0
+        self.layer_names = []
+        self.layers = np.zeros((0, 0, 0), dtype=np.uint16)
+        self.solid = np.zeros((0, 0), dtype=bool)
+        self.interactable = np.zeros((0, 0), dtype=bool)
+        self.solid_index = CollisionIndex(self.solid, tile_size)
+        self.ladder_index = CollisionIndex(self.interactable, tile_size)
+
+        # Tile registry: tile id -> (type, variant) and back, plus the solid and ladder flag of each id
+        self.tile_kinds = [None]
+        self.tile_ids = {}
+        self.tile_solid = [False]
+        self.tile_ladder = [False]
+        self.tile_images = None
+        self.kind_positions = {}
+        self.layer_positions = []
+        self.revision = 0  # Bumped whenever tiles appear or disappear, so callers can refresh what they derived from them
+
+        # Static layers are baked lazily into chunk surfaces of chunk_size x chunk_size tiles
+        self.chunk_size = chunk_size
+        self.chunks = ChunkCache(chunk_cache_bytes)
+        self.tile_overflow = (0, 0)  # How many cells the largest tile image spills right and down
+
+    def register_tile(self, tile_type, variant, solid=None, ladder=None):
+        key = (tile_type, variant)
+        if key not in self.tile_ids:
+            self.tile_ids[key] = len(self.tile_kinds)
+            self.tile_kinds.append(key)
+            self.tile_solid.append(tile_type in PHYSICS_TILE_TYPES if solid is None else bool(solid))
+            self.tile_ladder.append(tile_type in INTRERACTABLE_TILE_TYPES if ladder is None else bool(ladder))
+            self.tile_images = None
+        return self.tile_ids[key]
+
+    def tile_records(self):
+        # (type, variant, solid, ladder) of every registered tile, in id order
+        return [kind + (solid, ladder) for kind, solid, ladder in zip(self.tile_kinds[1:], self.tile_solid[1:], self.tile_ladder[1:])]
 
     def load(self, level):
-        # Load the map tilemap
-        self.tmx_data = pytmx.load_pygame(f'./graphics/levels/{level}/{level}.tmx')
-
-        # Iterate through the layers and create the tilemap
-        for layer_index, layer in enumerate(self.tmx_data.visible_layers):
-            for x, y, surf in layer.tiles():
-                key = str(x) + ';' + str(y)
-                if key not in self.tilemap:
-                    self.tilemap[key] = []
-                if layer.name == 'Ground':
-                    if layer.data[y][x] == 1:
-                        self.tilemap[key].append({'type': 'grass', 'variant': 0, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 2:
-                        self.tilemap[key].append({'type': 'grass', 'variant': 2, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 3:
-                        self.tilemap[key].append({'type': 'grass', 'variant': 1, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 4:
-                        self.tilemap[key].append({'type': 'grass', 'variant': 3, 'pos': (x, y), 'layer': layer_index})
-                if layer.name == 'Decor':
-                    if layer.data[y][x] == 5:
-                        self.tilemap[key].append({'type': 'decor', 'variant': 0, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 6:
-                        self.tilemap[key].append({'type': 'decor', 'variant': 1, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 7:
-                        self.tilemap[key].append({'type': 'decor', 'variant': 2, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 8:
-                        self.tilemap[key].append({'type': 'decor', 'variant': 3, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 9:
-                        self.tilemap[key].append({'type': 'decor', 'variant': 4, 'pos': (x, y), 'layer': layer_index})
-                if layer.name == 'Trees':
-                    if layer.data[y][x] == 10:
-                        self.tilemap[key].append({'type': 'tree', 'variant': 0, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 11:
-                        self.tilemap[key].append({'type': 'tree', 'variant': 1, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 12:
-                        self.tilemap[key].append({'type': 'tree', 'variant': 2, 'pos': (x, y), 'layer': layer_index})
-                    if layer.data[y][x] == 13:
-                        self.tilemap[key].append({'type': 'tree', 'variant': 3, 'pos': (x, y), 'layer': layer_index})
-                if layer.name == 'Ladder':
-                    self.tilemap[key].append({'type': 'ladder', 'variant': 0, 'pos': (x, y), 'layer': layer_index})
-                if layer.name == "Player":
-                    self.player_position = (x, y)
-                if layer.name == 'Enemy':
-                    self.enemy_positions.append((x, y))
-                if layer.name == 'Boss':
-                    self.boss_counter += 1
-                    if self.boss_counter == 4:
-                        self.boss_positions.append((x, y))
-                        self.boss_counter = 0
-                        
+        tmx_path = f'./graphics/levels/{level}/{level}.tmx'
+
+        # Use the compiled level next to the TMX when it is up to date, otherwise parse and rebuild it
+        source = source_hash(tmx_path)
+        level_data = load_compiled(compiled_path(tmx_path), source)
+        if level_data is None:
+            level_data = self.read_tmx(tmx_path)
+            save_compiled(compiled_path(tmx_path), source, level_data)
+        self.load_data(level_data)
+
+    def load_data(self, level):
+        """
+        Make a level current, replacing whatever was loaded before.
+
+        :param level: Level data as load_compiled() and read_tmx() return it: 'layers' (layer, y, x) of tile ids
+                      indexing 'tiles' (type, variant, solid, ladder) records from 1, 'layer_names',
+                      'player_position', 'enemy_positions' and 'boss_positions' in cells.
+        """
+        # Remap the level's tile ids onto this tilemap's registry
+        lookup = np.array([0] + [self.register_tile(*record) for record in level['tiles']], dtype=np.uint16)
+        self.layers = lookup[level['layers']]
+        self.layer_names = level['layer_names']
+        self.height, self.width = self.layers.shape[1:]
+        self.player_position = level['player_position']
+        self.enemy_positions = level['enemy_positions']
+        self.boss_positions = level['boss_positions']
+        self.offgrid_tiles = []
+
+        self.update_masks()
+        self.build_indexes()
+        self.reset_render_state()
+
+    def reset_render_state(self):
+        # Drop what was baked or measured for the last level's tiles
+        self.tile_images = None
+        self.tile_overflow = (0, 0)
+        self.chunks.clear()
+        self.revision += 1
+
+    def read_tmx(self, tmx_path):
+        """
+        Parse a TMX map, registering its tiles with this tilemap.
+
+        :return: Level data for load_data() and save_compiled().
+        """
+        tmx_data = pytmx.load_pygame(tmx_path)
+        layers = [layer for layer in tmx_data.visible_layers if isinstance(layer, pytmx.TiledTileLayer)]
+        grids = np.zeros((len(layers), tmx_data.height, tmx_data.width), dtype=np.uint16)
+        player_position, enemy_positions, boss_positions = (0, 0), [], []
+
+        # Register every tile the tileset gives a type, as a gid -> tile id lookup for all layers
+        lookup = np.zeros(tmx_data.maxgid + 1, dtype=np.uint16)
+        for gid, properties in tmx_data.tile_properties.items():
+            if properties.get('type') and gid < len(lookup):
+                lookup[gid] = self.register_tile(properties['type'], int(properties.get('variant', 0)),
+                                                 properties.get('solid'), properties.get('ladder'))
+
+        # Iterate through the layers and fill in the tile planes
+        boss_counter = 0
+        for layer_index, layer in enumerate(layers):
+            data = np.asarray(layer.data, dtype=np.int32)
+            if layer.name == 'Player':
+                for y, x in np.argwhere(data):
+                    player_position = (int(x), int(y))
+            elif layer.name == 'Enemy':
+                enemy_positions.extend((int(x), int(y)) for y, x in np.argwhere(data))
+            elif layer.name == 'Boss':
+                # Each boss covers four tiles, the last one in row order is its spawn
+                for y, x in np.argwhere(data):
+                    boss_counter += 1
+                    if boss_counter == 4:
+                        boss_positions.append((int(x), int(y)))
+                        boss_counter = 0
+            else:
+                grids[layer_index] = lookup[data]
+
+        return {
+            'layers': grids,
+            'layer_names': [layer.name for layer in layers],
+            'tiles': self.tile_records(),
+            'player_position': player_position,
+            'enemy_positions': enemy_positions,
+            'boss_positions': boss_positions,
+        }
+
+    def masks(self, layers):
+        # Solid and interactable cell masks for a block of tile planes
+        solid = np.array(self.tile_solid)[layers].any(axis=0)
+        interactable = np.array(self.tile_ladder)[layers].any(axis=0)
+        return solid, interactable
+
+    def update_masks(self):
+        self.solid, self.interactable = self.masks(self.layers)
+        self.solid_index = CollisionIndex(self.solid, self.tile_size)
+        self.ladder_index = CollisionIndex(self.interactable, self.tile_size)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_solid(self, x, y):
+        return self.in_bounds(x, y) and bool(self.solid[y, x])
+
+    def solid_cells(self, xs, ys):
+        # is_solid for arrays of cell coordinates, cells outside the map are not solid
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        solid = np.zeros(len(xs), dtype=bool)
+        solid[inside] = self.solid[ys[inside], xs[inside]]
+        return solid
+
+    def region(self, start_x, end_x, start_y, end_y):
+        # Tile ids of every layer for a cell range inside the map
+        return self.layers[:, start_y:end_y, start_x:end_x]
+
+    def tile_id(self, x, y, layer):
+        if not self.in_bounds(x, y):
+            return 0
+        return int(self.region(x, x + 1, y, y + 1)[layer, 0, 0])
+
+    def tiles_at(self, x, y):
+        # Compatibility view of a single cell as the tile dicts the old string-keyed store held
+        tiles = []
+        if self.in_bounds(x, y):
+            for layer_index, tile_id in enumerate(self.region(x, x + 1, y, y + 1)[:, 0, 0].tolist()):
+                if tile_id:
+                    tile_type, variant = self.tile_kinds[tile_id]
+                    tiles.append({'type': tile_type, 'variant': variant, 'pos': (x, y), 'layer': layer_index})
+        return tiles
+
+    def build_indexes(self):
+        # Tile positions by tile id and by layer, kept in map order and updated as tiles are removed
+        self.kind_positions = {}
+        self.layer_positions = [{} for _ in range(len(self.layer_names))]
+        self.index_tiles(self.layers, 0, 0)
+
+    def index_tiles(self, layers, origin_x, origin_y, add=True):
+        # Add or drop the tiles of a block of tile planes whose top left cell is (origin_x, origin_y)
+        layer_ids, ys, xs = np.nonzero(layers)
+        for layer_index, y, x, tile_id in zip(layer_ids.tolist(), (ys + origin_y).tolist(), (xs + origin_x).tolist(), layers[layer_ids, ys, xs].tolist()):
+            if add:
+                self.kind_positions.setdefault(tile_id, {})[(layer_index, x, y)] = None
+                self.layer_positions[layer_index][(x, y)] = tile_id
+            else:
+                self.kind_positions[tile_id].pop((layer_index, x, y), None)
+                self.layer_positions[layer_index].pop((x, y), None)
+
+    def tile_dict(self, layer_index, x, y, tile_id):
+        tile_type, variant = self.tile_kinds[tile_id]
+        return {'type': tile_type, 'variant': variant, 'pos': [x * self.tile_size, y * self.tile_size], 'layer': layer_index}
+
+    def tiles_of_kind(self, id_pairs):
+        tiles = []
+        for pair in id_pairs:
+            tile_id = self.tile_ids.get(pair)
+            for layer_index, x, y in self.kind_positions.get(tile_id, ()):
+                tiles.append(self.tile_dict(layer_index, x, y, tile_id))
+        return tiles
+
+    def tiles_in_layer(self, layer_name):
+        if layer_name not in self.layer_names:
+            return []
+        layer_index = self.layer_names.index(layer_name)
+        return [self.tile_dict(layer_index, x, y, tile_id) for (x, y), tile_id in self.layer_positions[layer_index].items()]
+
+    def tiles_in_rect(self, rect, id_pairs=None):
+        """
+        Find the tiles overlapping an area of the map.
+
+        :param rect: Area to search as (x, y, width, height) in pixels.
+        :param id_pairs: Optional (type, variant) pairs to restrict the search to.
+        :return: List of tile dicts with pixel positions, like extract returns.
+        """
+        x, y, w, h = rect
+        start_x, end_x = max(int(x // self.tile_size), 0), min(-int(-(x + w) // self.tile_size), self.width)
+        start_y, end_y = max(int(y // self.tile_size), 0), min(-int(-(y + h) // self.tile_size), self.height)
+        if start_x >= end_x or start_y >= end_y:
+            return []
+
+        region = self.region(start_x, end_x, start_y, end_y)
+        if id_pairs is None:
+            found = region != 0
+        else:
+            found = np.isin(region, [self.tile_ids[pair] for pair in id_pairs if pair in self.tile_ids])
+        layer_ids, ys, xs = np.nonzero(found)
+        return [self.tile_dict(layer_index, tx + start_x, ty + start_y, tile_id)
+                for layer_index, ty, tx, tile_id in zip(layer_ids.tolist(), ys.tolist(), xs.tolist(), region[layer_ids, ys, xs].tolist())]
+
+    def remove_tiles(self, positions):
+        # Clear (layer, x, y) cells from the grid, the indexes and the baked chunks, then refresh collision
+        for layer_index, x, y in positions:
+            tile_id = int(self.layers[layer_index, y, x])
+            if not tile_id:
+                continue
+            self.layers[layer_index, y, x] = 0
+            del self.kind_positions[tile_id][(layer_index, x, y)]
+            del self.layer_positions[layer_index][(x, y)]
+            self.invalidate_tile(x, y)
+        self.update_masks()
+        self.revision += 1
 
     def extract(self, id_pairs, keep=False):
         matches = []
@@ -77,21 +302,12 @@ class Tilemap:
                 if not keep:
                     self.offgrid_tiles.remove(tile)
 
-        for loc in list(self.tilemap.keys()):
-            for tile in self.tilemap[loc]:
-                if (tile['type'], tile['variant']) in id_pairs:
-                    match = tile.copy()
-                    match['pos'] = list(match['pos'])
-                    match['pos'][0] *= self.tile_size
-                    match['pos'][1] *= self.tile_size
-                    matches.append(match)
-                    if not keep:
-                        self.tilemap[loc].remove(tile)
-                        if not self.tilemap[loc]:  # Remove the key if the list is empty
-                            del self.tilemap[loc]
-
-        return matches
-    
+        tiles = self.tiles_of_kind(id_pairs)
+        if not keep and tiles:
+            self.remove_tiles([(tile['layer'], tile['pos'][0] // self.tile_size, tile['pos'][1] // self.tile_size) for tile in tiles])
+
+        return matches + tiles
+
     def get_player_spawn(self):
         return self.player_pos
 
@@ -99,11 +315,9 @@ class Tilemap:
         tiles = []
         tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
         for offset in NEIGHBORS_OFFSETS:
-            check_loc = str(tile_loc[0] + offset[0]) + ';' + str(tile_loc[1] + offset[1])
-            if check_loc in self.tilemap:
-                tiles.extend(self.tilemap[check_loc])
+            tiles.extend(self.tiles_at(tile_loc[0] + offset[0], tile_loc[1] + offset[1]))
         return tiles
-    
+
     def physics_rects_around(self, pos, entity_size):
         """
         Find all physics-related rectangles around the given position
@@ -111,52 +325,94 @@ class Tilemap:
 
         :param pos: Position of the entity (x, y).
         :param entity_size: Size of the entity (width, height).
-        :return: List of pygame.Rect representing the physics collision boxes.
+        :return: List of shared pygame.Rect, the merged row spans of solid tiles.
+        """
+        return self.solid_index.query((pos[0], pos[1], entity_size[0], entity_size[1]))[1]
+
+    def physics_spans_around(self, pos, entity_size, movement=(0, 0)):
+        """
+        Find the solid spans for a whole move in one query over the entity's swept box.
+
+        :param pos: Position of the entity (x, y) before moving.
+        :param entity_size: Size of the entity (width, height).
+        :param movement: Movement this frame (dx, dy).
+        :return: Tuple of (column spans for horizontal collisions, row spans for vertical collisions).
         """
-        rects = []
-        # Calculate the number of tiles the entity covers
-        start_tile_x = int(pos[0] // self.tile_size)
-        end_tile_x = int((pos[0] + entity_size[0]) // self.tile_size) + 1
-        start_tile_y = int(pos[1] // self.tile_size)
-        end_tile_y = int((pos[1] + entity_size[1]) // self.tile_size) + 1
-
-        for x in range(start_tile_x, end_tile_x):
-            for y in range(start_tile_y, end_tile_y):
-                check_loc = f"{x};{y}"
-                if check_loc in self.tilemap:
-                    for tile in self.tilemap[check_loc]:
-                        if tile['type'] in PHYSICS_TILE_TYPES:
-                            rect = pygame.Rect(
-                                tile['pos'][0] * self.tile_size,
-                                tile['pos'][1] * self.tile_size,
-                                tile.get('width', self.tile_size),
-                                tile.get('height', self.tile_size)
-                            )
-                            rects.append(rect)
-        return rects
-    
+        return self.solid_index.query((min(pos[0], pos[0] + movement[0]), min(pos[1], pos[1] + movement[1]),
+                                       entity_size[0] + abs(movement[0]), entity_size[1] + abs(movement[1])))
+
+    def solid_collides(self, rect):
+        return self.solid_index.collides(rect)
+
     def ladders_around(self, pos):
-        ladders = []
-        for tile in self.tiles_arounds(pos):
-            if tile['type'] in INTRERACTABLE_TILE_TYPES:
-                ladders.append(pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size))
-        return ladders
-    
+        tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
+        return self.ladder_index.query_cells(tile_loc[0] - 1, tile_loc[0] + 2, tile_loc[1] - 1, tile_loc[1] + 2)[0]
+
     def interaction_rects_around(self, pos):
-        rects = []
-        for tile in self.tiles_arounds(pos):
-            if tile['type'] in INTRERACTABLE_TILE_TYPES:
-                rects.append(pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size))
-        return rects
+        return self.ladders_around(pos)
+
+    def load_tile_images(self):
+        self.tile_images = [None] + [self.game.assets[tile_type][variant] for tile_type, variant in self.tile_kinds[1:]]
+        self.tile_overflow = (max([-(-img.get_width() // self.tile_size) - 1 for img in self.tile_images[1:]], default=0),
+                              max([-(-img.get_height() // self.tile_size) - 1 for img in self.tile_images[1:]], default=0))
+        self.chunks.clear()
+
+    def invalidate_tile(self, x, y):
+        # Drop every baked chunk the tile image at (x, y) can reach
+        for cx in range(x // self.chunk_size, (x + self.tile_overflow[0]) // self.chunk_size + 1):
+            for cy in range(y // self.chunk_size, (y + self.tile_overflow[1]) // self.chunk_size + 1):
+                self.chunks.discard((cx, cy))
+
+    def bake_chunk(self, cx, cy):
+        chunk_px = self.chunk_size * self.tile_size
+        surf = pygame.Surface((chunk_px, chunk_px))
+        if pygame.display.get_surface():
+            surf = surf.convert()
+        surf.set_colorkey((0, 0, 0))
+
+        # Include the cells above and left of the chunk whose images spill into it
+        start_x = max(cx * self.chunk_size - self.tile_overflow[0], 0)
+        end_x = min((cx + 1) * self.chunk_size, self.width)
+        start_y = max(cy * self.chunk_size - self.tile_overflow[1], 0)
+        end_y = min((cy + 1) * self.chunk_size, self.height)
+
+        # Draw layer by layer so upper layers always cover lower ones
+        for plane in self.region(start_x, end_x, start_y, end_y):
+            ys, xs = np.nonzero(plane)
+            surf.blits([(self.tile_images[tile_id], ((x + start_x - cx * self.chunk_size) * self.tile_size, (y + start_y - cy * self.chunk_size) * self.tile_size))
+                        for tile_id, x, y in zip(plane[ys, xs].tolist(), xs.tolist(), ys.tolist())], doreturn=False)
+        self.chunks.put((cx, cy), surf)
+        return surf
+
+    def chunk_ready(self, cx, cy):
+        # Whether the tiles a chunk surface is baked from are all in memory
+        return True
+
+    def update(self, offset=(0, 0), view_size=(0, 0)):
+        pass
+
+    def close(self):
+        pass  # Nothing running in the background, see StreamingTilemap
 
     def render(self, surf, offset=(0, 0)):
         # Offgrid tiles will need to be optimized for larger games
         for tile in self.offgrid_tiles:
             surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1]))
 
-        for x in range(offset[0] // self.tile_size, (offset[0] + surf.get_width()) // self.tile_size + 1):
-            for y in range(offset[1] // self.tile_size, (offset[1] + surf.get_height()) // self.tile_size + 1):
-                loc = str(x) + ';' + str(y)
-                if loc in self.tilemap:
-                    for tile in sorted(self.tilemap[loc], key=lambda t: t['layer']):
-                        surf.blit(self.game.assets[tile['type']][tile['variant']], (x * self.tile_size - offset[0], y * self.tile_size - offset[1]))
\ No newline at end of file
+        if self.tile_images is None:
+            self.load_tile_images()
+
+        chunk_px = self.chunk_size * self.tile_size
+        start_cx = max(offset[0] // chunk_px, 0)
+        end_cx = min((offset[0] + surf.get_width()) // chunk_px + 1, -(-self.width // self.chunk_size))
+        start_cy = max(offset[1] // chunk_px, 0)
+        end_cy = min((offset[1] + surf.get_height()) // chunk_px + 1, -(-self.height // self.chunk_size))
+
+        blits = []
+        for cx in range(start_cx, end_cx):
+            for cy in range(start_cy, end_cy):
+                if not self.chunk_ready(cx, cy):
+                    continue
+                chunk = self.chunks.get((cx, cy)) or self.bake_chunk(cx, cy)
+                blits.append((chunk, (cx * chunk_px - offset[0], cy * chunk_px - offset[1])))
+        surf.blits(blits, doreturn=False)
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import pygame
+
+TRANSFORM_CACHE_ENTRIES = 512  # Unpinned transformed surfaces kept before the least recently used is dropped
+ALPHA_STEP = 8  # Alphas are rounded to multiples of this, so fades share surfaces
+ROTATION_STEP = 5  # Degrees, rotations are rounded to multiples of this
+
+
+# Flipped, faded and rotated versions of surfaces, made once and reused. Keyed by (source, flip_x, alpha bucket,
+# rotation bucket). Pinned entries, like the flipped animation frames warmed at load, are never evicted.
+class TransformCache:
+    def __init__(self, max_entries=TRANSFORM_CACHE_ENTRIES, alpha_step=ALPHA_STEP, rotation_step=ROTATION_STEP):
+        self.max_entries = max_entries
+        self.alpha_step = alpha_step
+        self.rotation_step = rotation_step
+        self.pinned = {}
+        self.entries = OrderedDict()
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.pinned) + len(self.entries)
+
+    def key(self, surf, flip_x, alpha, rotation):
+        alpha = min(255, max(0, round(alpha / self.alpha_step) * self.alpha_step))
+        rotation = round(rotation / self.rotation_step) * self.rotation_step % 360
+        return surf, bool(flip_x), alpha, rotation
+
+    def get(self, surf, flip_x=False, alpha=255, rotation=0, pin=False):
+        """
+        Get a transformed version of a surface.
+
+        :param surf: Source surface. Must not be changed afterwards, the cache keeps using it.
+        :param flip_x: Mirror horizontally.
+        :param alpha: Surface alpha, rounded to the alpha step.
+        :param rotation: Degrees counterclockwise, rounded to the rotation step.
+        :param pin: Keep the result for good instead of in the LRU part.
+        :return: The transformed surface, or surf itself when nothing changes. Shared: don't draw on it.
+        """
+        key = self.key(surf, flip_x, alpha, rotation)
+        if key[1:] == (False, 255, 0):
+            return surf
+        img = self.pinned.get(key)
+        if img is not None:
+            return img
+        img = self.entries.get(key)
+        if img is not None:
+            self.entries.move_to_end(key)
+            if pin:
+                self.pinned[key] = self.entries.pop(key)
+            return img
+
+        img = self.build(*key)
+        self.misses += 1
+        if pin:
+            self.pinned[key] = img
+        else:
+            self.entries[key] = img
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return img
+
+    def build(self, surf, flip_x, alpha, rotation):
+        img = surf
+        if flip_x:
+            img = pygame.transform.flip(img, True, False)
+        if rotation:
+            img = pygame.transform.rotate(img, rotation)
+        if alpha != 255:
+            if img is surf:
+                img = surf.copy()
+            img.set_alpha(alpha)
+        return img
+
+    def drop(self, images):
+        # Forget every transform of these sources, e.g. when their asset is released
+        images = set(images)
+        for cache in (self.pinned, self.entries):
+            for key in [key for key in cache if key[0] in images]:
+                del cache[key]
+
+    def warm(self, images, flip_x=True, alpha=255, rotation=0):
+        # Pin the transforms of a set of frames up front, e.g. the mirrored frames of an animation
+        for img in images:
+            self.get(img, flip_x, alpha, rotation, pin=True)
@@ -0,0 +1,107 @@
+from collections import OrderedDict
+import pygame
+
+IRIS_STEP = 12  # Radius change per frame
+IRIS_MASK_BYTES = 8 * 1024 * 1024  # Memory cap for kept iris masks, a whole iris over the 320x240 display fits
+FADE_FRAMES = 20
+WIPE_FRAMES = 24
+TRANSITION_COLOR = (0, 0, 0)
+MASK_KEY = (255, 255, 255)  # Keyed out of iris masks to leave the hole
+
+iris_masks = OrderedDict()  # (display size, radius) -> mask, least recently used first, kept for the next transition
+iris_mask_bytes = 0
+
+
+def iris_mask(size, radius):
+    # Black with a see-through circle in the middle. Drawn once per radius, every later iris only blits it
+    global iris_mask_bytes
+    mask = iris_masks.get((size, radius))
+    if mask is not None:
+        iris_masks.move_to_end((size, radius))
+        return mask
+
+    mask = pygame.Surface(size)
+    mask.fill(TRANSITION_COLOR)
+    pygame.draw.circle(mask, MASK_KEY, (size[0] // 2, size[1] // 2), radius)
+    mask.set_colorkey(MASK_KEY, pygame.RLEACCEL)  # Long runs of one colour, so run-length encoding pays off
+    iris_masks[(size, radius)] = mask
+    iris_mask_bytes += size[0] * size[1] * mask.get_bytesize()
+    # Other window sizes and radii would pile up otherwise
+    while iris_mask_bytes > IRIS_MASK_BYTES and len(iris_masks) > 1:
+        (evicted_size, _), evicted = iris_masks.popitem(last=False)
+        iris_mask_bytes -= evicted_size[0] * evicted_size[1] * evicted.get_bytesize()
+    return mask
+
+
+# A screen transition over a frozen frame. The scene is drawn once into the snapshot, then every step
+# only blits the snapshot and covers part of it, instead of rendering the level again.
+class Transition:
+    def __init__(self, snapshot, frames, closing=True):
+        """
+        :param snapshot: Copy of the frame to transition from (closing) or to (opening).
+        :param frames: Steps the transition takes.
+        :param closing: Cover the frame up, or uncover it when False.
+        """
+        self.snapshot = snapshot
+        self.frames = frames
+        self.closing = closing
+        self.frame = 0
+
+    @property
+    def done(self):
+        return self.frame >= self.frames
+
+    def step(self, surf):
+        # Draw the next step onto surf
+        self.frame += 1
+        amount = self.frame / self.frames  # How much of the frame is covered, 0 to 1
+        surf.blit(self.snapshot, (0, 0))
+        self.cover(surf, amount if self.closing else 1 - amount)
+
+    def cover(self, surf, amount):
+        pass
+
+
+class Iris(Transition):
+    def __init__(self, snapshot, closing=True, step=IRIS_STEP, start_radius=None):
+        """
+        :param start_radius: Radius of the open iris. Defaults to the smallest that uncovers the whole frame.
+        """
+        size = snapshot.get_size()
+        self.open_radius = int((size[0] ** 2 + size[1] ** 2) ** 0.5 / 2) + 1  # Corner to centre
+        start_radius = start_radius or self.open_radius
+        self.radii = list(range(start_radius - step, 0, -step)) + [0]
+        if not closing:
+            self.radii.reverse()
+        super().__init__(snapshot, len(self.radii), closing)
+
+    def step(self, surf):
+        radius = self.radii[self.frame]
+        self.frame += 1
+        surf.blit(self.snapshot, (0, 0))
+        if radius < self.open_radius:  # Past that the hole is bigger than the frame and there is nothing to cover
+            surf.blit(iris_mask(surf.get_size(), radius), (0, 0))
+
+
+class Fade(Transition):
+    def __init__(self, snapshot, closing=True, frames=FADE_FRAMES):
+        super().__init__(snapshot, frames, closing)
+        self.overlay = pygame.Surface(snapshot.get_size())
+        self.overlay.fill(TRANSITION_COLOR)
+
+    def cover(self, surf, amount):
+        self.overlay.set_alpha(int(255 * amount))
+        surf.blit(self.overlay, (0, 0))
+
+
+class Wipe(Transition):
+    # Covers from the left edge when closing and uncovers towards the right when opening
+    def __init__(self, snapshot, closing=True, frames=WIPE_FRAMES):
+        super().__init__(snapshot, frames, closing)
+
+    def cover(self, surf, amount):
+        width = int(surf.get_width() * amount)
+        if self.closing:
+            surf.fill(TRANSITION_COLOR, (0, 0, width, surf.get_height()))
+        else:
+            surf.fill(TRANSITION_COLOR, (surf.get_width() - width, 0, width, surf.get_height()))
@@ -4,6 +4,11 @@ import os
 import math  # Import math module for rotation calculations
 from scripts.entities import Enemy, Boss
 
+SHURIKEN_COOLDOWN = 60  # Frames, matches the cooldown the player sets on a throw
+OUTLINE_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]
+
+# The HUD is drawn onto one transparent layer that is only redrawn when what it shows changes:
+# player health, shuriken cooldown or enemy count. Outlined text and the cooldown pie frames are cached too.
 class UI:
     def __init__(self, game):
         self.game = game
@@ -19,10 +24,28 @@ class UI:
         self.display_duration = 5  # Time to display the control guide before starting to fade out
         self.fade_duration = 5  # Duration of the fade-out effect
 
+        self.text_cache = {}  # (text, color) -> outlined text surface
+        self.cooldown_frames = [self.make_cooldown_frame(cooldown) for cooldown in range(SHURIKEN_COOLDOWN + 1)]
+        self.layer = None
+        self.layer_key = None
+
     def render(self, surf):
-        self.render_player_health_bar(surf)
-        self.render_shuriken_cooldown(surf)
-        self.render_objective(surf)  # Add this line to render the objective and counter
+        player = self.game.player
+        cooldown = player.shuriken_cooldown if player.shuriken_cooldown > 2 else min(player.shuriken_cooldown, 1)
+        key = (player.health, cooldown, len(self.game.enemies), surf.get_width())
+        if key != self.layer_key:
+            self.redraw(surf.get_width())
+            self.layer_key = key
+        surf.blit(self.layer, (0, 0))
+
+    def redraw(self, width):
+        if self.layer is None or self.layer.get_width() != width:
+            # Tall enough for the two rows of text on the right
+            self.layer = pygame.Surface((width, 32 + self.font.get_linesize()), pygame.SRCALPHA)
+        self.layer.fill((0, 0, 0, 0))
+        self.render_player_health_bar(self.layer)
+        self.render_shuriken_cooldown(self.layer)
+        self.render_objective(self.layer)  # Add this line to render the objective and counter
         # self.render_control_guide(surf)
         # self.render_enemy_counter(surf)
         # self.render_boss_counter(surf)
@@ -30,6 +53,18 @@ class UI:
     def update(self):
         pass
 
+    def text(self, text, color, outline_color=(0, 0, 0)):
+        # Text with a 1px outline, drawn from (-1, -1) of where the plain text would be
+        key = (text, color, outline_color)
+        if key not in self.text_cache:
+            outline = self.font.render(text, True, outline_color)
+            surface = pygame.Surface((outline.get_width() + 2, outline.get_height() + 2), pygame.SRCALPHA)
+            for dx, dy in OUTLINE_OFFSETS:
+                surface.blit(outline, (1 + dx, 1 + dy))
+            surface.blit(self.font.render(text, True, color), (1, 1))
+            self.text_cache[key] = surface
+        return self.text_cache[key]
+
     def render_player_health_bar(self, surf):
         player = self.game.player
         health_bar_width = 100
@@ -48,51 +83,46 @@ class UI:
         # Draw the green health bar
         pygame.draw.rect(surf, (0, 255, 0), (health_bar_x, health_bar_y, health_bar_width * health_ratio, health_bar_height))
 
+    def make_cooldown_frame(self, cooldown, radius=6):
+        # Dark pie covering the part of the cooldown still left, starting from the top and going clockwise
+        cooldown_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        if cooldown <= 2:
+            return cooldown_surface
+
+        # Calculate the filled angle
+        filled_angle = (cooldown / SHURIKEN_COOLDOWN) * 2 * math.pi
+
+        # Draw the filled arc as a polygon (a pie shape)
+        points = [(radius, radius)]  # Start at the center of the circle
+        points.extend([
+            (radius + radius * math.cos(math.pi * 1.5 + angle),
+            radius + radius * math.sin(math.pi * 1.5 + angle))
+            for angle in [filled_angle * i / 20 for i in range(21)]
+        ])
+
+        # Ensure the polygon correctly closes the segment
+        if filled_angle < 2 * math.pi:
+            points.append((radius, radius))
+
+        pygame.draw.polygon(cooldown_surface, (30, 30, 30, 150), points)
+        return cooldown_surface
+
     def render_shuriken_cooldown(self, surf):
         player = self.game.player
-        cooldown_time = player.shuriken_cooldown / 60  # Convert frames to seconds (assuming 60 FPS)
-        max_cooldown = 1.0  # 1 second cooldown
 
         # Position the shuriken cooldown UI to the right of the health bar
         health_bar_x = 10
         health_bar_width = 100
         center = (health_bar_x + health_bar_width + 10, 15)  # Adjust the y-position if needed
-        radius = 6  # Radius of the circle
 
         if player.shuriken_cooldown > 0:
-            # Create a surface with per-pixel alpha
-            cooldown_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-
-            # Draw the dark grey circle background with alpha
-            pygame.draw.circle(cooldown_surface, (250, 250, 250, 0), (radius, radius), radius)  # Alpha set to 0 (transparent)
-
-            # Calculate the filled angle
-            filled_angle = (cooldown_time / max_cooldown) * 2 * math.pi
-
-            # Draw the filled arc as a polygon (a pie shape)
-            points = [(radius, radius)]  # Start at the center of the circle
-            points.extend([
-                (radius + radius * math.cos(math.pi * 1.5 + angle),
-                radius + radius * math.sin(math.pi * 1.5 + angle))
-                for angle in [filled_angle * i / 20 for i in range(21)]
-            ])
-
-            # Ensure the polygon correctly closes the segment
-            if filled_angle < 2 * math.pi:
-                points.append((radius, radius))
-            
             if player.shuriken_cooldown > 2:
-                pygame.draw.polygon(cooldown_surface, (30, 30, 30, 150), points)
-
-                # Blit the cooldown surface onto the main surface
-                surf.blit(cooldown_surface, (center[0] - radius, center[1] - radius))
+                frame = self.cooldown_frames[min(player.shuriken_cooldown, SHURIKEN_COOLDOWN)]
+                surf.blit(frame, frame.get_rect(center=center))
 
-                # Draw the shuriken image in the center
-                shuriken_rect = self.shuriken_image.get_rect(center=center)
-                surf.blit(self.shuriken_image, shuriken_rect)
-            else:
-                shuriken_rect = self.shuriken_image.get_rect(center=center)
-                surf.blit(self.shuriken_image, shuriken_rect)
+            # Draw the shuriken image in the center
+            shuriken_rect = self.shuriken_image.get_rect(center=center)
+            surf.blit(self.shuriken_image, shuriken_rect)
 
     def render_objective(self, surf):
         # Objective text
@@ -104,30 +134,20 @@ class UI:
         enemies_number_text = f"{remaining_enemies}"
 
         # Colors
-        outline_color = (0, 0, 0)  # Black color for the outline
         text_color = (255, 255, 255)  # White color for the main text
         enemies_number_color = (255, 0, 0)  # Red color for the number of enemies
 
-        # Render surfaces for the objective, counter, and number
-        objective_surface = self.font.render(objective_text, True, text_color)
-        counter_surface = self.font.render(counter_text, True, text_color)
-        enemies_number_surface = self.font.render(enemies_number_text, True, enemies_number_color)
+        # Outlined surfaces for the objective, counter, and number
+        objective_surface = self.text(objective_text, text_color)
+        counter_surface = self.text(counter_text, text_color)
+        enemies_number_surface = self.text(enemies_number_text, enemies_number_color)
 
-        # Position the text in the top right corner
+        # Position the text in the top right corner, the outline sticks out 1px on every side
         surf_width = surf.get_width()
-        objective_x = surf_width - objective_surface.get_width() - 10
-        counter_x = surf_width - (counter_surface.get_width() + enemies_number_surface.get_width()) - 10
+        objective_x = surf_width - (objective_surface.get_width() - 2) - 10
+        counter_x = surf_width - (counter_surface.get_width() - 2 + enemies_number_surface.get_width() - 2) - 10
         text_y = 10
 
-        # Render the outline by drawing the text offset in different directions
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]:
-            surf.blit(self.font.render(objective_text, True, outline_color), (objective_x + dx, text_y + dy))
-            surf.blit(self.font.render(counter_text, True, outline_color), (counter_x + dx, text_y + 20 + dy))
-            surf.blit(self.font.render(enemies_number_text, True, outline_color), (counter_x + counter_surface.get_width() + dx, text_y + 20 + dy))
-
-        # Render the actual text on top
-        surf.blit(objective_surface, (objective_x, text_y))
-        surf.blit(counter_surface, (counter_x, text_y + 20))
-        surf.blit(enemies_number_surface, (counter_x + counter_surface.get_width(), text_y + 20))
-
-
+        surf.blit(objective_surface, (objective_x - 1, text_y - 1))
+        surf.blit(counter_surface, (counter_x - 1, text_y + 20 - 1))
+        surf.blit(enemies_number_surface, (counter_x + counter_surface.get_width() - 2 - 1, text_y + 20 - 1))
@@ -4,9 +4,20 @@ import os
 
 BASE_IMG_PATH = "graphics/"
 
+# Files an AssetLoader already decoded, by path. load_image and load_sound use these instead of reading the file
+preloaded = {}
+# Frames cut from the converted atlas pages, by path. load_image returns these as they are, see scripts/atlas.py
+atlas_frames = {}
+
 
 def load_image(path):
-    img = pygame.image.load(BASE_IMG_PATH + path).convert()
+    frame = atlas_frames.get(BASE_IMG_PATH + path)
+    if frame is not None:
+        return frame
+    img = preloaded.get(BASE_IMG_PATH + path)
+    if img is None:
+        img = pygame.image.load(BASE_IMG_PATH + path)
+    img = img.convert()
     img.set_colorkey((0, 0, 0))
     return img
 
@@ -20,9 +31,26 @@ def load_images(path):
                        key=extract_number)
     for img_name in img_names:
         if img_name.endswith('.png'):
-            images.append(load_image(path + '/' + img_name).convert())
+            images.append(load_image(path + '/' + img_name))
     return images
 
+def load_sound(path, silent=False):
+    # Headless runs don't open an audio device, so they get a sound that does nothing
+    if silent:
+        return SilentSound()
+    sound = preloaded.get(path)
+    return sound if sound is not None else pygame.mixer.Sound(path)
+
+class SilentSound:
+    def play(self, *args, **kwargs):
+        pass
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
 class Animation:
     def __init__ (self, images, img_dur=5, loop=True):
         self.images = images